@@ -0,0 +1,126 @@
+"""
+Buffered project view / link click analytics.
+
+Ingest only bumps integers in memory: one array per UTC day, three
+counters (views, live clicks, GitHub clicks) per project id. A background
+task swaps the buffer out every ANALYTICS_FLUSH_SECONDS and upserts the
+totals into the project_stats_daily rollup table in one transaction, so
+the shared SQLite file sees a handful of writes per flush no matter how
+many events arrive.
+"""
+
+import asyncio
+import logging
+from array import array
+from datetime import date, datetime
+from typing import Dict, Iterable, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from starlette.concurrency import run_in_threadpool
+
+from config import ANALYTICS_FLUSH_SECONDS
+from db import SessionLocal, engine
+from models import Project, ProjectStat
+
+logger = logging.getLogger(__name__)
+
+KINDS = ("view", "live_click", "github_click")
+KIND_INDEX = {kind: i for i, kind in enumerate(KINDS)}
+COLUMNS = ("views", "live_clicks", "github_clicks")
+
+# SQLite caps bound parameters per statement; 5 per row keeps chunks well under it
+UPSERT_CHUNK_ROWS = 150
+
+
+class AnalyticsBuffer:
+    def __init__(self):
+        self.days: Dict[int, array] = {}  # day ordinal -> counts, index = project_id * 3 + kind
+        self.max_project_id = 0  # ids above this are rejected so bogus ids cannot grow the arrays
+        self.task = None
+
+    def record(self, project_id: int, kind: str, count: int = 1) -> bool:
+        if project_id < 1 or project_id > self.max_project_id:
+            return False
+        self.record_on(datetime.utcnow().toordinal(), project_id, kind, count)
+        return True
+
+    def record_on(self, day: int, project_id: int, kind: str, count: int):
+        counts = self.days.get(day)
+        if counts is None:
+            counts = self.days[day] = array("L", [0]) * (3 * (self.max_project_id + 1))
+        index = project_id * 3 + KIND_INDEX[kind]
+        if index >= len(counts):
+            counts.extend([0] * (index + 3 - len(counts)))
+        counts[index] += count
+
+    def swap(self) -> Dict[int, array]:
+        days, self.days = self.days, {}
+        return days
+
+    def restore(self, days: Dict[int, array]):
+        """Put counts from a failed flush back into the live buffer"""
+        for day, project_id, values in iter_rows(days):
+            for kind, value in zip(KINDS, values):
+                if value:
+                    self.record_on(day, project_id, kind, value)
+
+    async def flush(self):
+        days = self.swap()
+        try:
+            self.max_project_id = await run_in_threadpool(write_rollups, days)
+        except Exception:
+            logger.exception("Analytics flush failed; keeping counts for the next attempt")
+            self.restore(days)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(ANALYTICS_FLUSH_SECONDS)
+            await self.flush()
+
+    async def start(self):
+        self.max_project_id = await run_in_threadpool(write_rollups, {})
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+        await self.flush()
+
+
+def iter_rows(days: Dict[int, array]) -> Iterable[Tuple[int, int, tuple]]:
+    for day, counts in days.items():
+        for project_id in range(len(counts) // 3):
+            values = tuple(counts[project_id * 3:project_id * 3 + 3])
+            if any(values):
+                yield day, project_id, values
+
+
+def write_rollups(days: Dict[int, array]) -> int:
+    """Upsert buffered counts in one transaction; returns the current max project id"""
+    db = SessionLocal()
+    try:
+        rows = list(iter_rows(days))
+        if rows:
+            existing = {pid for (pid,) in db.query(Project.id).filter(Project.id.in_({r[1] for r in rows})).all()}
+            values = [
+                {"day": date.fromordinal(day), "project_id": project_id, **dict(zip(COLUMNS, counts))}
+                for day, project_id, counts in rows if project_id in existing
+            ]
+            insert = postgresql_insert if engine.dialect.name == "postgresql" else sqlite_insert
+            for start in range(0, len(values), UPSERT_CHUNK_ROWS):
+                stmt = insert(ProjectStat).values(values[start:start + UPSERT_CHUNK_ROWS])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[ProjectStat.day, ProjectStat.project_id],
+                    set_={column: getattr(ProjectStat, column) + getattr(stmt.excluded, column) for column in COLUMNS},
+                )
+                db.execute(stmt)
+            db.commit()
+        return db.query(func.max(Project.id)).scalar() or 0
+    finally:
+        db.close()
+
+
+analytics = AnalyticsBuffer()
@@ -0,0 +1,250 @@
+"""
+Online database snapshots that never pause the app.
+
+SQLite is copied with the online backup API a few pages at a time, sleeping
+between steps so readers and writers only ever wait for one short step.
+The copy is integrity-checked, gzipped into BACKUP_DIR and old snapshots
+are pruned (newest BACKUP_KEEP_LAST, plus the newest of each of the last
+BACKUP_KEEP_DAILY days). Postgres is streamed through pg_dump instead.
+
+    python backup.py create
+    python backup.py list
+    python backup.py prune
+    python backup.py restore <snapshot> [--yes]
+
+The admin API can queue a snapshot too (POST /backups); restoring is
+deliberately left to the CLI. A restore changes the database under a
+running app without it noticing, so GET / keeps serving its cached
+snapshot for up to PORTFOLIO_CACHE_MAX_AGE_SECONDS; restart the app to
+serve the restored data immediately.
+"""
+
+import argparse
+import gzip
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List
+
+from config import (
+    BACKUP_DIR, BACKUP_PAGES_PER_STEP, BACKUP_STEP_SLEEP_SECONDS, BACKUP_MAX_RESTARTS,
+    BACKUP_KEEP_LAST, BACKUP_KEEP_DAILY,
+)
+from db import engine
+
+SQLITE_SUFFIX = ".db.gz"
+POSTGRES_SUFFIX = ".dump"  # pg_dump custom format, already compressed
+
+# One snapshot at a time per process, whether it came from the API or a job retry
+_lock = threading.Lock()
+
+
+def snapshot_name(suffix: str) -> str:
+    stem = Path(engine.url.database or "portfolio").stem
+    return f"{stem}-{datetime.utcnow().strftime('%Y%m%dT%H%M%S%fZ')}{suffix}"
+
+
+def pg_command_env():
+    """libpq URL (without the password, so it stays out of `ps`) and an env carrying it"""
+    url = engine.url.set(drivername="postgresql")
+    env = dict(os.environ)
+    if url.password:
+        env["PGPASSWORD"] = url.password
+    return url.set(password=None).render_as_string(hide_password=False), env
+
+
+def check_integrity(path: Path):
+    connection = sqlite3.connect(path)
+    try:
+        result = connection.execute("PRAGMA integrity_check").fetchall()
+    finally:
+        connection.close()
+    if result != [("ok",)]:
+        raise RuntimeError(f"Integrity check failed for {path}: {result[:5]}")
+
+
+class BackupRestarted(Exception):
+    pass
+
+
+def copy_sqlite(source: sqlite3.Connection, target: sqlite3.Connection):
+    """Incremental online backup: BACKUP_PAGES_PER_STEP pages, then a pause.
+
+    A write from another connection makes SQLite start the copy over, so a
+    busy database could keep an incremental backup going forever. After
+    BACKUP_MAX_RESTARTS the copy is finished in a single step instead,
+    which holds the read lock only for as long as that one copy takes.
+    """
+    last_remaining = None
+    restarts = 0
+
+    def pause(status, remaining, total):
+        nonlocal last_remaining, restarts
+        if last_remaining is not None and remaining > last_remaining:
+            restarts += 1
+            if restarts > BACKUP_MAX_RESTARTS:
+                raise BackupRestarted()
+        last_remaining = remaining
+        if remaining:
+            time.sleep(BACKUP_STEP_SLEEP_SECONDS)
+
+    try:
+        source.backup(target, pages=BACKUP_PAGES_PER_STEP, progress=pause)
+    except BackupRestarted:
+        source.backup(target)
+
+
+def gzip_file(source: Path, destination: Path):
+    tmp = destination.with_name(destination.name + ".tmp")
+    with open(source, "rb") as src, gzip.open(tmp, "wb", compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    with open(tmp, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp, destination)
+
+
+def backup_sqlite() -> Path:
+    destination = BACKUP_DIR / snapshot_name(SQLITE_SUFFIX)
+    with tempfile.TemporaryDirectory(dir=BACKUP_DIR) as workdir:
+        copy_path = Path(workdir) / "copy.db"
+        source = sqlite3.connect(engine.url.database)
+        target = sqlite3.connect(copy_path)
+        try:
+            copy_sqlite(source, target)
+        finally:
+            target.close()
+            source.close()
+        check_integrity(copy_path)
+        gzip_file(copy_path, destination)
+    return destination
+
+
+def backup_postgres() -> Path:
+    destination = BACKUP_DIR / snapshot_name(POSTGRES_SUFFIX)
+    tmp = destination.with_name(destination.name + ".tmp")
+    url, env = pg_command_env()
+    try:
+        # pg_dump reads from one consistent MVCC snapshot and streams it straight to disk
+        with open(tmp, "wb") as out:
+            subprocess.run(["pg_dump", "--format=custom", "--no-owner", url], stdout=out, env=env, check=True)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp, destination)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return destination
+
+
+def create_backup() -> Path:
+    """Write a new snapshot and apply the retention policy; returns the snapshot path"""
+    BACKUP_DIR.mkdir(parents=True, exist_ok=True)
+    with _lock:
+        path = backup_postgres() if engine.dialect.name == "postgresql" else backup_sqlite()
+        prune()
+    return path
+
+
+def list_backups() -> List[Path]:
+    """Snapshots in BACKUP_DIR, newest first"""
+    if not BACKUP_DIR.is_dir():
+        return []
+    paths = [p for p in BACKUP_DIR.iterdir() if p.name.endswith((SQLITE_SUFFIX, POSTGRES_SUFFIX))]
+    return sorted(paths, key=lambda p: p.stat().st_mtime, reverse=True)
+
+
+def prune() -> List[Path]:
+    """Delete snapshots outside the retention policy; returns what was removed"""
+    keep = set()
+    days_seen = set()
+    for index, path in enumerate(list_backups()):
+        day = datetime.utcfromtimestamp(path.stat().st_mtime).date()
+        if index < BACKUP_KEEP_LAST:
+            keep.add(path)
+        if day not in days_seen and len(days_seen) < BACKUP_KEEP_DAILY:
+            days_seen.add(day)
+            keep.add(path)
+    removed = [path for path in list_backups() if path not in keep]
+    for path in removed:
+        path.unlink(missing_ok=True)
+    return removed
+
+
+def restore_sqlite(snapshot: Path):
+    with tempfile.TemporaryDirectory(dir=BACKUP_DIR) as workdir:
+        copy_path = Path(workdir) / "restore.db"
+        # gzip verifies its CRC on the way out, so a truncated snapshot fails here
+        with gzip.open(snapshot, "rb") as src, open(copy_path, "wb") as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        check_integrity(copy_path)
+        source = sqlite3.connect(copy_path)
+        target = sqlite3.connect(engine.url.database)
+        try:
+            # Copies into the live file under SQLite's own locking, so open connections see the restored data
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+    check_integrity(Path(engine.url.database))
+
+
+def restore_postgres(snapshot: Path):
+    url, env = pg_command_env()
+    # --list reads the whole archive table of contents and fails on a damaged file
+    subprocess.run(["pg_restore", "--list", str(snapshot)], stdout=subprocess.DEVNULL, check=True)
+    subprocess.run(
+        ["pg_restore", "--clean", "--if-exists", "--no-owner", "--single-transaction", "--dbname", url, str(snapshot)],
+        env=env, check=True
+    )
+
+
+def restore_backup(snapshot: Path):
+    if not snapshot.is_file():
+        raise FileNotFoundError(snapshot)
+    with _lock:
+        if engine.dialect.name == "postgresql":
+            restore_postgres(snapshot)
+        else:
+            restore_sqlite(snapshot)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Database snapshots")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("create", help="take a snapshot now")
+    commands.add_parser("list", help="show existing snapshots")
+    commands.add_parser("prune", help="apply the retention policy")
+    restore = commands.add_parser("restore", help="replace the database with a snapshot")
+    restore.add_argument("snapshot", help="file name in BACKUP_DIR or a path")
+    restore.add_argument("--yes", action="store_true", help="do not ask for confirmation")
+    args = parser.parse_args(argv)
+
+    if args.command == "create":
+        print(create_backup())
+    elif args.command == "list":
+        for path in list_backups():
+            stat = path.stat()
+            print(f"{path.name}\t{stat.st_size}\t{datetime.utcfromtimestamp(stat.st_mtime).isoformat()}Z")
+    elif args.command == "prune":
+        for path in prune():
+            print(f"removed {path.name}")
+    elif args.command == "restore":
+        snapshot = Path(args.snapshot)
+        if not snapshot.is_file():
+            snapshot = BACKUP_DIR / args.snapshot
+        if not args.yes and input(f"Replace the current database with {snapshot.name}? [y/N] ").lower() != "y":
+            print("Aborted")
+            return 1
+        restore_backup(snapshot)
+        print(f"Restored {snapshot.name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
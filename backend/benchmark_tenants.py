@@ -0,0 +1,161 @@
+"""
+Multi-tenant load benchmark: many portfolios in one process.
+
+Seeds a throwaway SQLite database with --tenants portfolios (hero, settings,
+projects, experiences each), then drives GET / through the ASGI app
+in-process with a Zipf-skewed tenant mix, half addressed by Host header
+and half by /t/{slug} prefix. Reports throughput, latency percentiles,
+snapshot cache behaviour and peak RSS. Nothing touches portfolio.db.
+
+    python benchmark_tenants.py                       # 10k tenants
+    python benchmark_tenants.py --tenants 1000 --requests 5000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tenants", type=int, default=10000)
+    parser.add_argument("--projects", type=int, default=6, help="projects per tenant")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of the tenant mix")
+    parser.add_argument("--cache-mb", type=int, default=None, help="override PORTFOLIO_CACHE_MAX_BYTES")
+    return parser.parse_args(argv)
+
+
+def configure(args, workdir: str):
+    """Settings must be in the environment before config.py is imported"""
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    os.environ["MULTI_TENANT"] = "true"
+    os.environ["UPLOAD_DIR"] = f"{workdir}/uploads"
+    os.environ["IMAGE_CACHE_DIR"] = f"{workdir}/image_cache"
+    # Measure the app, not the per-client rate limiter (every request comes from one "client")
+    os.environ["RATE_LIMIT_PUBLIC_PER_MINUTE"] = "100000000"
+    os.environ["RATE_LIMIT_PUBLIC_BURST"] = "100000000"
+    os.environ["TENANT_LOOKUP_CACHE_SIZE"] = str(2 * args.tenants + 100)
+    if args.cache_mb is not None:
+        os.environ["PORTFOLIO_CACHE_MAX_BYTES"] = str(args.cache_mb * 1024 * 1024)
+
+
+def seed(args):
+    from sqlalchemy import insert
+    from db import engine
+    from models import Base, Tenant, Hero, Settings, Project, Experience
+    from ordering import evenly_spaced_keys
+
+    Base.metadata.create_all(bind=engine)
+    positions = evenly_spaced_keys(args.projects)
+    with engine.begin() as connection:
+        for start in range(1, args.tenants + 1, 1000):
+            ids = range(start, min(start + 1000, args.tenants + 1))
+            connection.execute(insert(Tenant), [
+                {"id": i, "slug": f"t{i}", "host": f"t{i}.portfolio.test", "name": f"Tenant {i}"} for i in ids
+            ])
+            connection.execute(insert(Hero), [
+                {"tenant_id": i, "name": f"Person {i}", "title": "Engineer", "description": "Builds things. " * 10}
+                for i in ids
+            ])
+            connection.execute(insert(Settings), [{"tenant_id": i, "theme": "light", "font_size": "medium"} for i in ids])
+            connection.execute(insert(Project), [
+                {
+                    "tenant_id": i, "title": f"Project {n}", "description": "A project description. " * 8,
+                    "technologies": ["python", "react"], "is_featured": int(n < 2), "position": positions[n],
+                }
+                for i in ids for n in range(args.projects)
+            ])
+            connection.execute(insert(Experience), [
+                {"tenant_id": i, "title": "Engineer", "company": f"Company {n}", "duration": "2 years",
+                 "skills": ["python"], "position": positions[n]}
+                for i in ids for n in range(3)
+            ])
+
+
+def zipf_sampler(count: int, skew: float):
+    weights = [1 / (rank ** skew) for rank in range(1, count + 1)]
+    tenant_ids = list(range(1, count + 1))
+    random.shuffle(tenant_ids)  # hot tenants spread across the id space
+    return lambda k: random.choices(tenant_ids, weights=weights, k=k)
+
+
+async def run_phase(client, args, plan) -> dict:
+    latencies = []
+    errors = 0
+    queue = asyncio.Queue()
+    for n, tenant_id in enumerate(plan):
+        queue.put_nowait((n, tenant_id))
+
+    async def worker():
+        nonlocal errors
+        while not queue.empty():
+            n, tenant_id = queue.get_nowait()
+            if n % 2:
+                request = client.get(f"/t/t{tenant_id}/")
+            else:
+                request = client.get("/", headers={"host": f"t{tenant_id}.portfolio.test"})
+            started = time.perf_counter()
+            response = await request
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "throughput": len(plan) / elapsed,
+        "errors": errors,
+        "p50": latencies[len(latencies) // 2],
+        "p95": latencies[int(0.95 * (len(latencies) - 1))],
+        "p99": latencies[int(0.99 * (len(latencies) - 1))],
+        "mean": statistics.fmean(latencies),
+    }
+
+
+async def drive(args):
+    import httpx
+    import main
+
+    await main.app.router.startup()
+    sample = zipf_sampler(args.tenants, args.skew)
+    plans = {"cold": sample(args.requests), "warm": sample(args.requests)}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench") as client:
+        results = {name: await run_phase(client, args, plan) for name, plan in plans.items()}
+    await main.app.router.shutdown()
+
+    print(f"tenants            {args.tenants} ({len(set(plans['cold']) | set(plans['warm']))} requested)")
+    print(f"requests           {args.requests} per phase at concurrency {args.concurrency}")
+    for name, result in results.items():
+        print(f"{name:<6} phase         {result['throughput']:.0f} req/s, {result['errors']} errors, latency ms "
+              f"p50 {result['p50']:.2f}  p95 {result['p95']:.2f}  p99 {result['p99']:.2f}  mean {result['mean']:.2f}")
+    cache = main.portfolio_cache.metrics()
+    lookups = cache["hits"] + cache["stale_hits"] + cache["misses"]
+    print(f"snapshot cache     {cache['hits'] / lookups:.1%} hit, {cache['computes']} builds, "
+          f"{cache['evictions']} evictions, {cache['tenants']} tenants, {cache['bytes'] / 1024 / 1024:.1f} MiB")
+    print(f"tenant lookups     {len(main.tenant_directory.entries)} cached")
+    print(f"peak RSS           {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB")
+
+
+def main_cli(argv=None):
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory() as workdir:
+        configure(args, workdir)
+        started = time.perf_counter()
+        seed(args)
+        print(f"seeded             {args.tenants} tenants in {time.perf_counter() - started:.1f}s")
+        asyncio.run(drive(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
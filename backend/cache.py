@@ -0,0 +1,248 @@
+"""
+Single-flight snapshot cache with stale-while-revalidate for hot reads.
+
+Any commit that touches a watched model bumps the version of the tenant it
+belongs to. The next reader still gets that tenant's previous snapshot (if
+it is younger than the configured max staleness) while one background
+refresh rebuilds it; readers that find no usable snapshot all await that
+same refresh, so a burst of requests after an admin edit costs a single
+rebuild.
+
+Versions only see commits made in this process. Writes from elsewhere
+(backup.py restore, images.py backfill, tenancy.py, another worker) are
+picked up by age instead: a snapshot older than max_age_seconds is served
+once more while a background refresh replaces it.
+
+Change notifications carry version_token() of the write they announce.
+Clients that refetch with it as `min_version` never get a snapshot older
+than that write: they wait for (or start) a refresh that covers it, which
+the whole burst of notified clients still shares.
+
+Snapshots live in per-tenant LRUs. A tenant that outgrows
+PORTFOLIO_CACHE_TENANT_MAX_BYTES only evicts its own entries; past
+PORTFOLIO_CACHE_MAX_BYTES overall, the least recently used tenant loses
+its oldest entry first. A busy portfolio therefore cannot push everyone
+else out. Single-tenant mode is just the default tenant.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from sqlalchemy import event
+from starlette.concurrency import run_in_threadpool
+
+from config import (
+    PORTFOLIO_CACHE_MAX_STALE_SECONDS, PORTFOLIO_CACHE_MAX_AGE_SECONDS, PORTFOLIO_CACHE_MAX_BYTES,
+    PORTFOLIO_CACHE_TENANT_MAX_BYTES,
+)
+from models import DEFAULT_TENANT_ID
+
+logger = logging.getLogger(__name__)
+
+# Marker for changes whose tenant is unknown (unscoped bulk statements)
+ALL_TENANTS = object()
+
+
+def covers(version: tuple, min_version: Optional[tuple]) -> bool:
+    """Whether a snapshot taken at `version` already includes every write up to `min_version`"""
+    return min_version is None or (version[0] >= min_version[0] and version[1] >= min_version[1])
+
+
+def parse_version_token(token: Optional[str]) -> Optional[tuple]:
+    """Inverse of SnapshotCache.version_token(); None for missing or malformed tokens"""
+    try:
+        global_version, tenant_version = (int(part) for part in token.split("."))
+    except (AttributeError, ValueError):
+        return None
+    return global_version, tenant_version
+
+
+class Snapshot:
+    __slots__ = ("value", "version", "computed_at", "size")
+
+    def __init__(self, value: Any, version: tuple, computed_at: float):
+        self.value = value
+        self.version = version
+        self.computed_at = computed_at
+        self.size = len(value) if isinstance(value, (bytes, str)) else sys.getsizeof(value)
+
+
+class SnapshotCache:
+    def __init__(
+        self,
+        max_stale_seconds: float = PORTFOLIO_CACHE_MAX_STALE_SECONDS,
+        max_age_seconds: float = PORTFOLIO_CACHE_MAX_AGE_SECONDS,
+        max_bytes: int = PORTFOLIO_CACHE_MAX_BYTES,
+        tenant_max_bytes: int = PORTFOLIO_CACHE_TENANT_MAX_BYTES,
+    ):
+        self.max_stale_seconds = max_stale_seconds
+        self.max_age_seconds = max_age_seconds
+        self.max_bytes = max_bytes
+        self.tenant_max_bytes = tenant_max_bytes
+        self.version = 0  # bumped to invalidate every tenant at once
+        self.tenant_versions: Dict[Hashable, int] = {}
+        self.tenants: "OrderedDict[Hashable, OrderedDict[str, Snapshot]]" = OrderedDict()  # least recently used first
+        self.tenant_bytes: Dict[Hashable, int] = {}
+        self.total_bytes = 0
+        self.inflight: Dict[tuple, tuple] = {}  # (tenant, key) -> (future, version it was started at)
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "computes": 0, "expired": 0, "evictions": 0, "oversized": 0}
+
+    def invalidate(self, tenant: Hashable = DEFAULT_TENANT_ID, everyone: bool = False):
+        """Mark a tenant's snapshots (or, with everyone=True, all snapshots) stale. Safe from any thread."""
+        with self.lock:
+            if everyone:
+                self.version += 1
+            else:
+                self.tenant_versions[tenant] = self.tenant_versions.get(tenant, 0) + 1
+
+    def current_version(self, tenant: Hashable) -> tuple:
+        return self.version, self.tenant_versions.get(tenant, 0)
+
+    def version_token(self, tenant: Hashable = DEFAULT_TENANT_ID) -> str:
+        """Opaque form of the tenant's current version, for change notifications"""
+        return "%d.%d" % self.current_version(tenant)
+
+    async def get(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        tenant: Hashable = DEFAULT_TENANT_ID,
+        min_version: Optional[tuple] = None,
+    ) -> Any:
+        """Return the snapshot for `key` of `tenant`, computing it at most once concurrently.
+
+        With `min_version`, a stale snapshot is only served if it already
+        covers that version.
+        """
+        entries = self.tenants.get(tenant)
+        snapshot = entries.get(key) if entries is not None else None
+        if snapshot is not None:
+            self.tenants.move_to_end(tenant)
+            entries.move_to_end(key)
+            if snapshot.version == self.current_version(tenant):
+                self.stats["hits"] += 1
+                if time.monotonic() - snapshot.computed_at > self.max_age_seconds:
+                    self.stats["expired"] += 1
+                    self._refresh(tenant, key, compute)
+                return snapshot.value
+            if covers(snapshot.version, min_version) and time.monotonic() - snapshot.computed_at <= self.max_stale_seconds:
+                self.stats["stale_hits"] += 1
+                self._refresh(tenant, key, compute)
+                return snapshot.value
+        self.stats["misses"] += 1
+        return await asyncio.shield(self._refresh(tenant, key, compute, min_version))
+
+    def _refresh(
+        self, tenant: Hashable, key: str, compute: Callable[[], Any], min_version: Optional[tuple] = None
+    ) -> asyncio.Future:
+        running = self.inflight.get((tenant, key))
+        # A refresh that started before the write the caller knows about would hand back the old data
+        if running is not None and covers(running[1], min_version):
+            return running[0]
+        version = self.current_version(tenant)
+        future = asyncio.ensure_future(self._compute(tenant, key, compute, version))
+        self.inflight[(tenant, key)] = (future, version)
+        future.add_done_callback(lambda f: self._finish(tenant, key, f))
+        return future
+
+    def _finish(self, tenant: Hashable, key: str, future: asyncio.Future):
+        running = self.inflight.get((tenant, key))
+        if running is not None and running[0] is future:
+            del self.inflight[(tenant, key)]
+        if not future.cancelled() and future.exception() is not None:
+            logger.error("Refreshing cache key %r for tenant %r failed", key, tenant, exc_info=future.exception())
+
+    async def _compute(self, tenant: Hashable, key: str, compute: Callable[[], Any], version: tuple) -> Any:
+        # The version is captured before computing: a write landing mid-compute leaves the result stale
+        started = time.monotonic()
+        self.stats["computes"] += 1
+        value = await run_in_threadpool(compute)
+        current = self.tenants.get(tenant, {}).get(key)
+        # An older refresh finishing last must not replace a newer snapshot
+        if current is None or not covers(current.version, version) or current.version == version:
+            self._store(tenant, key, Snapshot(value, version, started))
+        return value
+
+    def _store(self, tenant: Hashable, key: str, snapshot: Snapshot):
+        self._discard(tenant, key)
+        if snapshot.size > self.tenant_max_bytes:
+            # Served, but never allowed to crowd out other entries
+            self.stats["oversized"] += 1
+            return
+        entries = self.tenants.get(tenant)
+        if entries is None:
+            entries = self.tenants[tenant] = OrderedDict()
+        self.tenants.move_to_end(tenant)
+        entries[key] = snapshot
+        self.tenant_bytes[tenant] = self.tenant_bytes.get(tenant, 0) + snapshot.size
+        self.total_bytes += snapshot.size
+
+        while self.tenant_bytes[tenant] > self.tenant_max_bytes:
+            self._evict_oldest(tenant)
+        while self.total_bytes > self.max_bytes and self.tenants:
+            self._evict_oldest(next(iter(self.tenants)))
+
+    def _discard(self, tenant: Hashable, key: str):
+        entries = self.tenants.get(tenant)
+        snapshot = entries.pop(key, None) if entries is not None else None
+        if snapshot is None:
+            return
+        self.tenant_bytes[tenant] -= snapshot.size
+        self.total_bytes -= snapshot.size
+        if not entries:
+            del self.tenants[tenant]
+            del self.tenant_bytes[tenant]
+
+    def _evict_oldest(self, tenant: Hashable):
+        self._discard(tenant, next(iter(self.tenants[tenant])))
+        self.stats["evictions"] += 1
+
+    def metrics(self) -> dict:
+        return {
+            **self.stats,
+            "tenants": len(self.tenants),
+            "entries": sum(len(entries) for entries in self.tenants.values()),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "tenant_max_bytes": self.tenant_max_bytes,
+        }
+
+
+def invalidate_on_commit(session_factory, models, cache: SnapshotCache):
+    """Invalidate the tenants whose `models` rows a session created by `session_factory` commits changes to"""
+    watched = tuple(models)
+
+    @event.listens_for(session_factory, "after_flush")
+    def remember_changes(session, flush_context):
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            if isinstance(obj, watched):
+                session.info.setdefault("invalidate_cache", set()).add(getattr(obj, "tenant_id", None) or DEFAULT_TENANT_ID)
+
+    @event.listens_for(session_factory, "after_bulk_update")
+    @event.listens_for(session_factory, "after_bulk_delete")
+    def remember_bulk_changes(state):
+        if state.mapper.class_ in watched:
+            # An unscoped bulk statement may have touched any tenant
+            tenant = state.session.info.get("tenant_id")
+            state.session.info.setdefault("invalidate_cache", set()).add(tenant if tenant is not None else ALL_TENANTS)
+
+    @event.listens_for(session_factory, "after_commit")
+    def invalidate(session):
+        for tenant in session.info.pop("invalidate_cache", ()):
+            if tenant is ALL_TENANTS:
+                cache.invalidate(everyone=True)
+            else:
+                cache.invalidate(tenant)
+
+    @event.listens_for(session_factory, "after_rollback")
+    def forget_changes(session):
+        session.info.pop("invalidate_cache", None)
+
+
+portfolio_cache = SnapshotCache()
@@ -1,5 +1,6 @@
 import os
-from decouple import config
+from pathlib import Path
+from decouple import config, Csv
 
 # Database Configuration
 DATABASE_URL = config("DATABASE_URL", default="sqlite:///./portfolio.db")
@@ -20,4 +21,96 @@ CORS_ORIGINS = [
     "http://127.0.0.1:3000",
     "http://127.0.0.1:5173",
     "https://umer-saeed.vercel.app"
-]
\ No newline at end of file
+]
+
+# Live Events Configuration
+EVENTS_QUEUE_SIZE = config("EVENTS_QUEUE_SIZE", default=32, cast=int)
+EVENTS_HEARTBEAT_SECONDS = config("EVENTS_HEARTBEAT_SECONDS", default=15, cast=int)
+
+# Ordering Configuration
+ORDERING_MAX_KEY_LENGTH = config("ORDERING_MAX_KEY_LENGTH", default=24, cast=int)
+
+# Batch Configuration
+BATCH_MAX_OPERATIONS = config("BATCH_MAX_OPERATIONS", default=200, cast=int)
+
+
+# Upload Configuration
+UPLOAD_DIR = Path(config("UPLOAD_DIR", default="uploads"))
+MAX_UPLOAD_BYTES = config("MAX_UPLOAD_BYTES", default=5 * 1024 * 1024, cast=int)
+
+# Storage Configuration
+STORAGE_BACKEND = config("STORAGE_BACKEND", default="local")  # local or s3
+PRESIGNED_URL_EXPIRE_SECONDS = config("PRESIGNED_URL_EXPIRE_SECONDS", default=600, cast=int)
+S3_BUCKET = config("S3_BUCKET", default="")
+S3_ENDPOINT_URL = config("S3_ENDPOINT_URL", default="")  # Set for MinIO or other S3-compatible stores
+S3_REGION = config("S3_REGION", default="")
+S3_ACCESS_KEY_ID = config("S3_ACCESS_KEY_ID", default="")
+S3_SECRET_ACCESS_KEY = config("S3_SECRET_ACCESS_KEY", default="")
+S3_PUBLIC_URL = config("S3_PUBLIC_URL", default="")  # e.g. a CDN in front of the bucket
+
+# Backup Configuration
+BACKUP_DIR = Path(config("BACKUP_DIR", default="backups"))
+BACKUP_PAGES_PER_STEP = config("BACKUP_PAGES_PER_STEP", default=256, cast=int)
+BACKUP_STEP_SLEEP_SECONDS = config("BACKUP_STEP_SLEEP_SECONDS", default=0.05, cast=float)
+BACKUP_MAX_RESTARTS = config("BACKUP_MAX_RESTARTS", default=5, cast=int)  # then finish in one step
+BACKUP_KEEP_LAST = config("BACKUP_KEEP_LAST", default=7, cast=int)
+BACKUP_KEEP_DAILY = config("BACKUP_KEEP_DAILY", default=30, cast=int)  # newest snapshot per day, for this many days
+
+# Background Job Configuration
+JOB_WORKERS = config("JOB_WORKERS", default=2, cast=int)
+JOB_POLL_SECONDS = config("JOB_POLL_SECONDS", default=5, cast=float)
+JOB_MAX_ATTEMPTS = config("JOB_MAX_ATTEMPTS", default=5, cast=int)
+JOB_RETRY_BASE_SECONDS = config("JOB_RETRY_BASE_SECONDS", default=2, cast=float)
+ORPHAN_UPLOAD_GRACE_SECONDS = config("ORPHAN_UPLOAD_GRACE_SECONDS", default=3600, cast=int)
+
+# Image Placeholder Configuration
+IMAGE_FETCH_TIMEOUT_SECONDS = config("IMAGE_FETCH_TIMEOUT_SECONDS", default=10, cast=float)
+IMAGE_FETCH_MAX_BYTES = config("IMAGE_FETCH_MAX_BYTES", default=10 * 1024 * 1024, cast=int)
+
+# Multi-Tenant Configuration
+MULTI_TENANT = config("MULTI_TENANT", default=False, cast=bool)
+TENANT_PATH_PREFIX = config("TENANT_PATH_PREFIX", default="/t")  # /t/{slug}/... selects a tenant by path
+TENANT_LOOKUP_CACHE_SIZE = config("TENANT_LOOKUP_CACHE_SIZE", default=20000, cast=int)
+TENANT_LOOKUP_TTL_SECONDS = config("TENANT_LOOKUP_TTL_SECONDS", default=60, cast=float)
+
+# Portfolio Cache Configuration
+PORTFOLIO_CACHE_MAX_STALE_SECONDS = config("PORTFOLIO_CACHE_MAX_STALE_SECONDS", default=30, cast=float)
+# Even unchanged snapshots are rebuilt (in the background) this often, to pick up writes made by other processes
+PORTFOLIO_CACHE_MAX_AGE_SECONDS = config("PORTFOLIO_CACHE_MAX_AGE_SECONDS", default=60, cast=float)
+PORTFOLIO_CACHE_MAX_BYTES = config("PORTFOLIO_CACHE_MAX_BYTES", default=256 * 1024 * 1024, cast=int)  # all tenants
+PORTFOLIO_CACHE_TENANT_MAX_BYTES = config("PORTFOLIO_CACHE_TENANT_MAX_BYTES", default=1024 * 1024, cast=int)  # any one tenant
+
+# Rate Limiting / Admission Control Configuration
+RATE_LIMIT_PUBLIC_PER_MINUTE = config("RATE_LIMIT_PUBLIC_PER_MINUTE", default=300, cast=float)
+RATE_LIMIT_PUBLIC_BURST = config("RATE_LIMIT_PUBLIC_BURST", default=60, cast=int)
+RATE_LIMIT_LOGIN_PER_MINUTE = config("RATE_LIMIT_LOGIN_PER_MINUTE", default=5, cast=float)
+RATE_LIMIT_LOGIN_BURST = config("RATE_LIMIT_LOGIN_BURST", default=5, cast=int)
+RATE_LIMIT_UPLOAD_PER_MINUTE = config("RATE_LIMIT_UPLOAD_PER_MINUTE", default=20, cast=float)
+RATE_LIMIT_UPLOAD_BURST = config("RATE_LIMIT_UPLOAD_BURST", default=10, cast=int)
+RATE_LIMIT_MAX_CLIENTS = config("RATE_LIMIT_MAX_CLIENTS", default=10000, cast=int)
+RATE_LIMIT_TRUST_PROXY = config("RATE_LIMIT_TRUST_PROXY", default=False, cast=bool)
+# Number of trusted proxies in front of the app; the client is the address the outermost one appended
+RATE_LIMIT_TRUSTED_PROXY_HOPS = config("RATE_LIMIT_TRUSTED_PROXY_HOPS", default=1, cast=int)
+MAX_CONCURRENT_REQUESTS = config("MAX_CONCURRENT_REQUESTS", default=64, cast=int)
+ADMISSION_QUEUE_SIZE = config("ADMISSION_QUEUE_SIZE", default=128, cast=int)
+ADMISSION_WAIT_SECONDS = config("ADMISSION_WAIT_SECONDS", default=1, cast=float)
+
+# Analytics Configuration
+ANALYTICS_FLUSH_SECONDS = config("ANALYTICS_FLUSH_SECONDS", default=5, cast=float)
+
+# Image Variant Configuration
+IMAGE_ORIGIN_URL = config("IMAGE_ORIGIN_URL", default="")  # e.g. https://cdn.example.com or file:///srv/images
+IMAGE_CACHE_DIR = Path(config("IMAGE_CACHE_DIR", default="image_cache"))
+IMAGE_CACHE_MAX_BYTES = config("IMAGE_CACHE_MAX_BYTES", default=512 * 1024 * 1024, cast=int)
+IMAGE_TRANSFORM_WORKERS = config("IMAGE_TRANSFORM_WORKERS", default=2, cast=int)
+IMAGE_MAX_DIMENSION = config("IMAGE_MAX_DIMENSION", default=2400, cast=int)
+# Requested widths/heights are rounded up to one of these, so each image has a bounded set of variants
+IMAGE_VARIANT_SIZES = sorted(config("IMAGE_VARIANT_SIZES", default="64,128,256,320,480,640,800,1024,1280,1600,1920,2400", cast=Csv(int)))
+
+# Profiling Configuration
+PROFILING_ENABLED = config("PROFILING_ENABLED", default=False, cast=bool)
+PROFILE_SAMPLE_INTERVAL_MS = config("PROFILE_SAMPLE_INTERVAL_MS", default=5, cast=float)
+PROFILE_MAX_SECONDS = config("PROFILE_MAX_SECONDS", default=60, cast=int)
+SLOW_REQUEST_THRESHOLD_MS = config("SLOW_REQUEST_THRESHOLD_MS", default=1000, cast=float)
+SLOW_REQUEST_BUFFER_SIZE = config("SLOW_REQUEST_BUFFER_SIZE", default=50, cast=int)
+SLOW_REQUEST_MAX_SQL = config("SLOW_REQUEST_MAX_SQL", default=200, cast=int)  # statements kept per capture
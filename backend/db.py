@@ -1,7 +1,9 @@
 from sqlalchemy import create_engine
+from starlette.requests import Request
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from config import DATABASE_URL
+from models import DEFAULT_TENANT_ID
 
 # Create SQLite engine
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
@@ -11,9 +13,10 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
-# Dependency to get DB session
-def get_db():
-    db = SessionLocal()
+# Dependency to get DB session, scoped to the request's tenant (see tenancy.py).
+# Single-tenant mode is scoped to the default tenant too, so queries keep using the (tenant_id, position) indexes.
+def get_db(request: Request):
+    db = SessionLocal(info={"tenant_id": request.scope.get("state", {}).get("tenant_id") or DEFAULT_TENANT_ID})
     try:
         yield db
     finally:
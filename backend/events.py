@@ -0,0 +1,108 @@
+"""
+Change notification broker for the /events Server-Sent Events stream.
+
+Write endpoints call publish() after they commit. Each notification carries
+the portfolio cache version of that commit, so clients can refetch GET /
+with ?min_version=... and never be handed a snapshot from before it.
+Every connected client owns a small bounded queue; a slow client never
+blocks the writer, it only loses its oldest pending notifications and is
+told to do a full reload instead.
+In multi-tenant mode clients only hear about their own tenant's changes.
+"""
+
+import asyncio
+import json
+from datetime import datetime
+from typing import Optional, Set
+
+from cache import portfolio_cache
+from config import EVENTS_QUEUE_SIZE, EVENTS_HEARTBEAT_SECONDS
+from models import DEFAULT_TENANT_ID
+from tenancy import current_tenant
+
+
+class Subscriber:
+    """A single connected client and its bounded notification queue"""
+
+    __slots__ = ("queue", "overflowed", "tenant")
+
+    def __init__(self, maxsize: int, tenant: Optional[int] = None):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+        self.tenant = tenant
+
+    def offer(self, message: str):
+        # Drop the oldest pending message instead of blocking the publisher
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+            self.overflowed = True
+        self.queue.put_nowait(message)
+
+
+class EventBroker:
+    """Fans out change notifications to all connected SSE clients"""
+
+    def __init__(self, queue_size: int = EVENTS_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.subscribers: Set[Subscriber] = set()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def subscribe(self) -> Subscriber:
+        self.loop = asyncio.get_running_loop()
+        subscriber = Subscriber(self.queue_size, current_tenant.get())
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+
+    def _broadcast(self, message: str, tenant: Optional[int]):
+        for subscriber in list(self.subscribers):
+            if subscriber.tenant == tenant:
+                subscriber.offer(message)
+
+    def publish(self, entity: str, entity_id: Optional[int], action: str, updated_at: Optional[datetime] = None):
+        """Broadcast a compact change notification to the current tenant. Safe to call from sync endpoints."""
+        if not self.subscribers or self.loop is None:
+            return
+        tenant = current_tenant.get()
+        message = json.dumps({
+            "entity": entity,
+            "id": entity_id,
+            "action": action,
+            "updated_at": updated_at.isoformat() if updated_at else None,
+            "version": portfolio_cache.version_token(tenant or DEFAULT_TENANT_ID),
+        })
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self._broadcast(message, tenant)
+        elif not self.loop.is_closed():
+            # Called from a threadpool worker (plain `def` endpoints)
+            self.loop.call_soon_threadsafe(self._broadcast, message, tenant)
+
+    async def stream(self, subscriber: Subscriber):
+        """Yield SSE frames for a subscriber until the client disconnects"""
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscriber.queue.get(), timeout=EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Comment frame keeps idle connections open through proxies
+                    yield ": ping\n\n"
+                    continue
+                if subscriber.overflowed:
+                    subscriber.overflowed = False
+                    yield "event: resync\ndata: {}\n\n"
+                yield f"event: change\ndata: {message}\n\n"
+        finally:
+            self.unsubscribe(subscriber)
+
+
+broker = EventBroker()
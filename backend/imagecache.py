@@ -0,0 +1,162 @@
+"""
+On-demand image variants for /img/{key}?w=&h=&fmt=.
+
+Sources come from upload storage or, failing that, IMAGE_ORIGIN_URL (which may
+be a file:// directory for local testing). Resizing and re-encoding run in
+a process pool so they never hold up the event loop, and results are kept
+in a disk cache capped at IMAGE_CACHE_MAX_BYTES with least-recently-used
+eviction. Concurrent requests for the same variant share one transform.
+Requested sizes are rounded up to IMAGE_VARIANT_SIZES, so arbitrary w/h
+values can't fill the cache with near-duplicates.
+"""
+
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import urllib.error
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from config import (
+    IMAGE_ORIGIN_URL, IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_BYTES, IMAGE_TRANSFORM_WORKERS, IMAGE_VARIANT_SIZES,
+)
+from images import download, transform_image
+from storage import storage, valid_key
+
+
+def snap_size(size: Optional[int]) -> Optional[int]:
+    """Smallest allowed variant size that is at least `size` (the largest one if none is)"""
+    if size is None:
+        return None
+    return next((allowed for allowed in IMAGE_VARIANT_SIZES if allowed >= size), IMAGE_VARIANT_SIZES[-1])
+
+
+class DiskLRUCache:
+    """Files in one directory, evicted least-recently-used first once over a byte budget"""
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[str, int]" = OrderedDict()  # name -> size, oldest first
+        self.total_bytes = 0
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Rebuild recency order from access times left by previous runs
+        files = [p for p in self.directory.iterdir() if p.is_file() and not p.name.endswith(".tmp")]
+        for path in sorted(files, key=lambda p: p.stat().st_atime):
+            size = path.stat().st_size
+            self.entries[path.name] = size
+            self.total_bytes += size
+        self._evict()
+
+    def get(self, name: str) -> Optional[Path]:
+        if name not in self.entries:
+            return None
+        path = self.directory / name
+        if not path.is_file():
+            self.total_bytes -= self.entries.pop(name)
+            return None
+        self.entries.move_to_end(name)
+        os.utime(path)
+        return path
+
+    def write(self, name: str, data: bytes) -> Path:
+        """Write a file atomically (blocking I/O, run it off the event loop), then call add()"""
+        path = self.directory / name
+        tmp = path.with_name(name + ".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        return path
+
+    def add(self, name: str, size: int):
+        if name in self.entries:
+            self.total_bytes -= self.entries.pop(name)
+        self.entries[name] = size
+        self.total_bytes += size
+        self._evict(keep=name)
+
+    def _evict(self, keep: str = None):
+        while self.total_bytes > self.max_bytes and self.entries:
+            name, size = next(iter(self.entries.items()))
+            if name == keep:
+                break
+            del self.entries[name]
+            self.total_bytes -= size
+            (self.directory / name).unlink(missing_ok=True)
+
+
+class ImageVariants:
+    def __init__(self):
+        self.cache = None
+        self.pool = None
+        self.inflight: Dict[str, asyncio.Future] = {}
+
+    def start(self):
+        self.cache = DiskLRUCache(IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_BYTES)
+        # spawn, not fork: by now the process has threads, and a forked child could inherit a held lock
+        self.pool = ProcessPoolExecutor(
+            max_workers=IMAGE_TRANSFORM_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def stop(self):
+        if self.pool:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+    @staticmethod
+    def variant_name(key: str, width: Optional[int], height: Optional[int], fmt: str) -> str:
+        digest = hashlib.sha256(f"{key}|{width}|{height}".encode()).hexdigest()[:32]
+        return f"{digest}.{fmt}"
+
+    @staticmethod
+    def load_source(key: str) -> bytes:
+        """Read the original from upload storage, falling back to the configured origin"""
+        if not valid_key(key):
+            raise FileNotFoundError(key)
+        try:
+            return storage.read(key)
+        except FileNotFoundError:
+            pass
+        if not IMAGE_ORIGIN_URL:
+            raise FileNotFoundError(key)
+        try:
+            return download(f"{IMAGE_ORIGIN_URL.rstrip('/')}/{key}", trusted=True)
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                raise FileNotFoundError(key)
+            raise
+        except urllib.error.URLError as e:
+            # file:// origins report a missing file this way
+            if isinstance(e.reason, FileNotFoundError):
+                raise FileNotFoundError(key)
+            raise
+
+    async def get(self, key: str, width: Optional[int], height: Optional[int], fmt: str) -> Path:
+        """Path of the cached variant, producing it (once, however many callers) if missing"""
+        width, height = snap_size(width), snap_size(height)
+        fmt = "jpeg" if fmt == "jpg" else fmt
+        name = self.variant_name(key, width, height, fmt)
+        path = self.cache.get(name)
+        if path is not None:
+            return path
+        future = self.inflight.get(name)
+        if future is None:
+            future = asyncio.ensure_future(self._produce(name, key, width, height, fmt))
+            self.inflight[name] = future
+            future.add_done_callback(lambda f: self.inflight.pop(name, None))
+        return await asyncio.shield(future)
+
+    async def _produce(self, name: str, key: str, width: Optional[int], height: Optional[int], fmt: str) -> Path:
+        source = await run_in_threadpool(self.load_source, key)
+        loop = asyncio.get_running_loop()
+        data = await loop.run_in_executor(self.pool, transform_image, source, width, height, fmt)
+        path = await run_in_threadpool(self.cache.write, name, data)
+        self.cache.add(name, len(data))
+        return path
+
+
+image_variants = ImageVariants()
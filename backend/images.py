@@ -0,0 +1,178 @@
+"""
+Image placeholders: intrinsic size, dominant colour and a tiny blurred
+preview (LQIP data URI) stored next to each hero/project image URL, so the
+frontend can reserve layout space and paint something before the real
+image arrives.
+
+Computed by the "compute_image_placeholder" background job whenever an
+image URL changes. Existing rows can be backfilled with:
+
+    python images.py            # rows that have no placeholder yet
+    python images.py --all      # recompute everything
+
+A running app picks backfilled values up within PORTFOLIO_CACHE_MAX_AGE_SECONDS.
+"""
+
+import base64
+import ipaddress
+import socket
+import sys
+import urllib.parse
+import urllib.request
+from io import BytesIO
+
+from PIL import Image, ImageFilter, ImageOps
+from sqlalchemy.orm import Session
+
+from config import IMAGE_FETCH_TIMEOUT_SECONDS, IMAGE_FETCH_MAX_BYTES
+from models import Hero, Project
+from storage import storage, key_from_url
+
+# entity -> (model, URL column, prefix of the metadata columns)
+IMAGE_FIELDS = {
+    "hero": (Hero, "profile_image", "profile_image_"),
+    "project": (Project, "image", "image_"),
+}
+
+PLACEHOLDER_SIZE = 16
+
+
+def load_image_bytes(url: str) -> bytes:
+    """Read an image from upload storage if it is one of ours, otherwise download it"""
+    key = key_from_url(url)
+    if key:
+        try:
+            return storage.read(key)
+        except FileNotFoundError:
+            pass
+    return download(url)
+
+
+def check_public_url(url: str):
+    """Refuse URLs that are not http(s) or that point at this host or its private network"""
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError(f"Only http(s) image URLs can be fetched: {url}")
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(parts.hostname, parts.port or 443, proto=socket.IPPROTO_TCP)}
+    except socket.gaierror as e:
+        raise ValueError(f"Cannot resolve image host {parts.hostname}: {e}")
+    if not all(ipaddress.ip_address(address.split("%", 1)[0]).is_global for address in addresses):
+        raise ValueError(f"Image host {parts.hostname} is not a public address")
+
+
+class PublicRedirectHandler(urllib.request.HTTPRedirectHandler):
+    """Apply check_public_url to every redirect hop, not just the first URL"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        check_public_url(newurl)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+_public_opener = urllib.request.build_opener(PublicRedirectHandler)
+
+
+def download(url: str, trusted: bool = False) -> bytes:
+    """Fetch an image, refusing anything over IMAGE_FETCH_MAX_BYTES.
+
+    Admin-entered URLs must be public http(s). Only `trusted` URLs (the
+    operator-configured IMAGE_ORIGIN_URL) may use file:// or private hosts.
+    """
+    request = urllib.request.Request(url, headers={"User-Agent": "portfolio-api"})
+    if trusted:
+        opener = urllib.request.urlopen
+    else:
+        check_public_url(url)
+        opener = _public_opener.open
+    with opener(request, timeout=IMAGE_FETCH_TIMEOUT_SECONDS) as response:
+        data = response.read(IMAGE_FETCH_MAX_BYTES + 1)
+    if len(data) > IMAGE_FETCH_MAX_BYTES:
+        raise ValueError(f"Image larger than {IMAGE_FETCH_MAX_BYTES} bytes: {url}")
+    return data
+
+
+def compute_placeholder(data: bytes) -> dict:
+    """Width, height, dominant colour (#rrggbb) and a base64 JPEG preview"""
+    with Image.open(BytesIO(data)) as img:
+        img = ImageOps.exif_transpose(img)
+        width, height = img.size
+        rgb = img.convert("RGB")
+
+    r, g, b = rgb.resize((1, 1), Image.BOX).getpixel((0, 0))
+    thumb = rgb.copy()
+    thumb.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+    thumb = thumb.filter(ImageFilter.GaussianBlur(1))
+    buffer = BytesIO()
+    thumb.save(buffer, format="JPEG", quality=50, optimize=True)
+
+    return {
+        "width": width,
+        "height": height,
+        "color": f"#{r:02x}{g:02x}{b:02x}",
+        "placeholder": "data:image/jpeg;base64," + base64.b64encode(buffer.getvalue()).decode(),
+    }
+
+
+# Output formats accepted by transform_image -> Pillow format name
+TRANSFORM_FORMATS = {"webp": "WEBP", "jpeg": "JPEG", "jpg": "JPEG", "png": "PNG"}
+
+
+def transform_image(data: bytes, width: int = None, height: int = None, fmt: str = "webp") -> bytes:
+    """Resize to fit within width x height (never upscaling) and re-encode.
+
+    Runs in a worker process, so it must stay a picklable top-level function.
+    """
+    with Image.open(BytesIO(data)) as img:
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((width or img.width, height or img.height), Image.LANCZOS)
+        pil_format = TRANSFORM_FORMATS[fmt]
+        if pil_format == "JPEG" and img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        buffer = BytesIO()
+        if pil_format == "PNG":
+            img.save(buffer, format=pil_format, optimize=True)
+        else:
+            img.save(buffer, format=pil_format, quality=80)
+    return buffer.getvalue()
+
+
+def set_placeholder(row, entity: str, values: dict = None):
+    """Store computed metadata on a row, or clear it when `values` is None"""
+    prefix = IMAGE_FIELDS[entity][2]
+    for key in ("width", "height", "color", "placeholder"):
+        setattr(row, prefix + key, values[key] if values else None)
+
+
+def update_placeholder(db: Session, entity: str, row_id: int):
+    """Recompute the placeholder for one row (caller commits)"""
+    model, url_field, _ = IMAGE_FIELDS[entity]
+    row = db.get(model, row_id)
+    if row is None:
+        return
+    url = getattr(row, url_field)
+    set_placeholder(row, entity, compute_placeholder(load_image_bytes(url)) if url else None)
+
+
+def backfill(db: Session, recompute: bool = False):
+    for entity, (model, url_field, prefix) in IMAGE_FIELDS.items():
+        query = db.query(model.id).filter(getattr(model, url_field).isnot(None))
+        if not recompute:
+            query = query.filter(getattr(model, prefix + "width").is_(None))
+        for (row_id,) in query.all():
+            try:
+                update_placeholder(db, entity, row_id)
+                db.commit()
+                print(f"{entity} {row_id}: ok")
+            except Exception as e:
+                db.rollback()
+                print(f"{entity} {row_id}: {e}")
+
+
+if __name__ == "__main__":
+    from db import SessionLocal
+
+    session = SessionLocal()
+    try:
+        backfill(session, recompute="--all" in sys.argv)
+    finally:
+        session.close()
@@ -0,0 +1,167 @@
+"""
+Durable in-process background jobs backed by the `jobs` table.
+
+Request handlers call enqueue() after their own commit and return right
+away; a small pool of worker threads picks jobs up, retries failures with
+exponential backoff and records the outcome. Because jobs live in the
+database, pending work survives restarts. Enqueueing a job that is
+identical (same kind and payload) to one still pending is a no-op.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import traceback
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from config import JOB_WORKERS, JOB_POLL_SECONDS, JOB_MAX_ATTEMPTS, JOB_RETRY_BASE_SECONDS
+from db import SessionLocal
+from models import Job
+
+logger = logging.getLogger(__name__)
+
+# Jobs stuck in "running" longer than this are assumed to belong to a dead process
+STALE_RUNNING_AFTER = timedelta(minutes=10)
+# Finished jobs are kept this long for the status endpoint, then pruned
+KEEP_FINISHED_FOR = timedelta(days=7)
+
+HANDLERS: Dict[str, Callable[[Session, dict], None]] = {}
+
+
+def job_handler(kind: str):
+    """Register a function as the handler for jobs of `kind`"""
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+def dedupe_key(kind: str, payload: Optional[dict]) -> str:
+    raw = json.dumps([kind, payload or {}], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def enqueue(db: Session, kind: str, payload: Optional[dict] = None, delay_seconds: float = 0) -> Job:
+    """Queue a job, or return the identical job that is already pending"""
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    key = dedupe_key(kind, payload)
+    existing = db.query(Job).filter(Job.dedupe_key == key, Job.status == "pending").first()
+    if existing:
+        return existing
+
+    job = Job(
+        kind=kind,
+        payload=payload or {},
+        dedupe_key=key,
+        max_attempts=JOB_MAX_ATTEMPTS,
+        run_after=datetime.utcnow() + timedelta(seconds=delay_seconds),
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    pool.wake()
+    return job
+
+
+class WorkerPool:
+    """Worker threads that claim due jobs from the database and run them"""
+
+    def __init__(self, size: int = JOB_WORKERS):
+        self.size = size
+        self.threads = []
+        self.stopping = threading.Event()
+        self.wakeup = threading.Event()
+
+    def wake(self):
+        self.wakeup.set()
+
+    def start(self):
+        if self.threads:
+            return
+        self._recover()
+        self.stopping.clear()
+        for i in range(self.size):
+            thread = threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self, timeout: float = 5):
+        self.stopping.set()
+        self.wakeup.set()
+        for thread in self.threads:
+            thread.join(timeout)
+        self.threads = []
+
+    def _recover(self):
+        """Requeue jobs orphaned by a crashed process and prune old finished ones"""
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            db.query(Job).filter(
+                Job.status == "running", Job.updated_at < now - STALE_RUNNING_AFTER
+            ).update({Job.status: "pending", Job.run_after: now}, synchronize_session=False)
+            db.query(Job).filter(
+                Job.status.in_(("done", "failed")), Job.updated_at < now - KEEP_FINISHED_FOR
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def _claim(self, db: Session) -> Optional[Job]:
+        while True:
+            now = datetime.utcnow()
+            candidate = db.query(Job.id).filter(
+                Job.status == "pending", Job.run_after <= now
+            ).order_by(Job.run_after, Job.id).first()
+            if candidate is None:
+                return None
+            # Conditional update so only one worker wins the job
+            claimed = db.query(Job).filter(Job.id == candidate[0], Job.status == "pending").update(
+                {Job.status: "running", Job.attempts: Job.attempts + 1, Job.updated_at: now},
+                synchronize_session=False
+            )
+            db.commit()
+            if claimed:
+                return db.get(Job, candidate[0])
+
+    def _execute(self, db: Session, job: Job):
+        try:
+            HANDLERS[job.kind](db, job.payload or {})
+        except Exception:
+            db.rollback()
+            job.last_error = traceback.format_exc(limit=5)
+            if job.attempts >= job.max_attempts:
+                job.status = "failed"
+                logger.error("Job %s (%s) failed permanently", job.id, job.kind)
+            else:
+                job.status = "pending"
+                backoff = JOB_RETRY_BASE_SECONDS * 2 ** (job.attempts - 1)
+                job.run_after = datetime.utcnow() + timedelta(seconds=backoff)
+        else:
+            job.status = "done"
+            job.last_error = None
+        job.updated_at = datetime.utcnow()
+        db.commit()
+
+    def _run(self):
+        while not self.stopping.is_set():
+            db = SessionLocal()
+            try:
+                job = self._claim(db)
+                if job is not None:
+                    self._execute(db, job)
+                    continue
+            except Exception:
+                logger.exception("Job worker error")
+            finally:
+                db.close()
+            self.wakeup.wait(JOB_POLL_SECONDS)
+            self.wakeup.clear()
+
+
+pool = WorkerPool()
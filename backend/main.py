@@ -1,36 +1,69 @@
-from fastapi import FastAPI, Depends, HTTPException, status, File, UploadFile
+from fastapi import FastAPI, Depends, HTTPException, status, File, UploadFile, BackgroundTasks, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import StreamingResponse, Response, FileResponse, RedirectResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import or_, func
+from pydantic import ValidationError
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from typing import List, Optional
 import json
+import logging
 import os
 import uuid
-from pathlib import Path
 
 # Import local modules
-from db import get_db, engine
-from models import Base, Hero, Project, Experience, Settings
+from db import get_db, engine, SessionLocal
+from models import Base, Hero, Project, Experience, Settings, Job, ProjectStat, DEFAULT_TENANT_ID
 from schemas import (
     HeroCreate, HeroUpdate, Hero as HeroSchema,
     ProjectCreate, ProjectUpdate, Project as ProjectSchema,
     ExperienceCreate, ExperienceUpdate, Experience as ExperienceSchema,
     SettingsCreate, SettingsUpdate, Settings as SettingsSchema,
-    UserLogin, Token, PortfolioData
+    UserLogin, Token, PortfolioData, MoveRequest,
+    ArchiveRequest, ArchiveResult, ProjectArchivePage, ExperienceArchivePage,
+    Job as JobSchema,
+    AnalyticsBatch, ProjectStats, ProjectDailyStats,
+    PresignRequest, PresignResponse, Backup as BackupSchema,
+    BatchRequest, BatchResponse, BatchOperationResult
 )
-from config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, ADMIN_USERNAME, ADMIN_PASSWORD, CORS_ORIGINS
+from events import broker
+from jobs import enqueue, pool as job_pool
+from images import set_placeholder, IMAGE_FIELDS
+from cache import portfolio_cache, invalidate_on_commit, parse_version_token
+from ratelimit import AdmissionControlMiddleware, admission
+from analytics import analytics
+from imagecache import image_variants
+from images import TRANSFORM_FORMATS
+from storage import storage, LocalStorage
+from backup import list_backups
+from profiling import (
+    SlowRequestMiddleware, slow_requests, install_sql_logging, profile_for, to_folded, to_speedscope,
+)
+from tenancy import (
+    TenantMiddleware, tenant_directory, scope_sessions_to_tenant, tenant_session, request_tenant,
+    ensure_default_tenant, verify_tenant_admin,
+)
+import tasks  # noqa: F401  (registers background job handlers)
+from ordering import key_between, next_position, needs_rebalance, rebalance_positions, backfill_positions
+from config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, ADMIN_USERNAME, ADMIN_PASSWORD, CORS_ORIGINS, UPLOAD_DIR, IMAGE_MAX_DIMENSION, MAX_UPLOAD_BYTES
+from config import PROFILING_ENABLED, PROFILE_MAX_SECONDS, PROFILE_SAMPLE_INTERVAL_MS
+from config import MULTI_TENANT
+
+logger = logging.getLogger(__name__)
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
-# Create uploads directory if it doesn't exist
-UPLOAD_DIR = Path("uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
+# Rebuild the public snapshot whenever portfolio content is committed
+invalidate_on_commit(SessionLocal, (Hero, Project, Experience, Settings), portfolio_cache)
+
+# Sessions opened for a tenant only ever see that tenant's rows
+scope_sessions_to_tenant(SessionLocal)
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -39,8 +72,25 @@ app = FastAPI(
     version="1.0.0"
 )
 
-# Mount static files for uploads
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+# Serve uploads: straight from disk for local storage, otherwise redirect to the bucket
+if isinstance(storage, LocalStorage):
+    app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
+else:
+    @app.get("/uploads/{key:path}", include_in_schema=False)
+    def redirect_upload(key: str):
+        return RedirectResponse(storage.url_for(key), status_code=307)
+
+# Slow-request capture (inside admission control, so queueing time is not counted)
+if PROFILING_ENABLED:
+    install_sql_logging(engine)
+    app.add_middleware(SlowRequestMiddleware, monitor=slow_requests)
+
+# Rate limiting and load shedding (added before CORS so rejections still carry CORS headers)
+app.add_middleware(AdmissionControlMiddleware, controller=admission)
+
+# Tenant resolution by path prefix or Host header (outside admission so budgets see the stripped path)
+if MULTI_TENANT:
+    app.add_middleware(TenantMiddleware, directory=tenant_directory)
 
 # Add CORS middleware
 app.add_middleware(
@@ -51,6 +101,54 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+def create_default_tenant():
+    if MULTI_TENANT:
+        ensure_default_tenant()
+
+@app.on_event("startup")
+def assign_missing_positions():
+    """Give legacy/seeded rows a position so ORDER BY position is total"""
+    db = SessionLocal()
+    try:
+        backfill_positions(db, Project)
+        backfill_positions(db, Experience)
+    finally:
+        db.close()
+
+@app.on_event("startup")
+def start_job_workers():
+    job_pool.start()
+
+@app.on_event("shutdown")
+def stop_job_workers():
+    job_pool.stop()
+
+@app.on_event("startup")
+async def start_analytics_flush():
+    await analytics.start()
+
+@app.on_event("shutdown")
+async def flush_analytics():
+    await analytics.stop()
+
+@app.on_event("startup")
+def start_image_variants():
+    image_variants.start()
+
+@app.on_event("shutdown")
+def stop_image_variants():
+    image_variants.stop()
+
+@app.on_event("startup")
+def start_slow_request_watcher():
+    if PROFILING_ENABLED:
+        slow_requests.start()
+
+@app.on_event("shutdown")
+def stop_slow_request_watcher():
+    slow_requests.stop()
+
 # Security setup
 security = HTTPBearer()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -66,7 +164,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+def verify_token(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)):
     try:
         payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
@@ -76,21 +174,112 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
                 detail="Could not validate credentials",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        return username
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    # Tokens are scoped to the tenant they were issued for (older tokens predate tenants)
+    if payload.get("tenant", DEFAULT_TENANT_ID) != (request_tenant(request) or DEFAULT_TENANT_ID):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Token is not valid for this portfolio")
+    return username
+
+def verify_operator_token(request: Request, current_user: str = Depends(verify_token)):
+    """Process-wide admin endpoints (jobs, backups, profiling, metrics) belong to the default tenant's admin"""
+    if (request_tenant(request) or DEFAULT_TENANT_ID) != DEFAULT_TENANT_ID:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only the server operator can do this")
+    return current_user
+
+def rebalance_in_background(model, tenant_id: Optional[int]):
+    db = tenant_session(tenant_id)
+    try:
+        rebalance_positions(db, model)
+    finally:
+        db.close()
+
+def move_row(db: Session, model, row_id: int, move: MoveRequest, background_tasks: BackgroundTasks):
+    """Place a row after `move.after_id` and/or before `move.before_id` (no neighbours = move to end)"""
+    label = model.__name__
+    row = db.query(model).filter(model.id == row_id).first()
+    if not row:
+        raise HTTPException(status_code=404, detail=f"{label} not found")
+
+    neighbour_ids = {i for i in (move.after_id, move.before_id) if i is not None}
+    if row_id in neighbour_ids:
+        raise HTTPException(status_code=400, detail=f"A {label.lower()} cannot be moved next to itself")
+    neighbours = {n.id: n for n in db.query(model).filter(model.id.in_(neighbour_ids)).all()} if neighbour_ids else {}
+    if len(neighbours) != len(neighbour_ids):
+        raise HTTPException(status_code=404, detail=f"Neighbouring {label.lower()} not found")
+
+    after = neighbours.get(move.after_id)
+    before = neighbours.get(move.before_id)
+    others = db.query(model.position).filter(model.id != row_id, model.archived_at.is_(None))
+    lower = after.position if after else None
+    upper = before.position if before else None
+    if after is not None and before is None:
+        following = others.filter(model.position > after.position).order_by(model.position).first()
+        upper = following[0] if following else None
+    elif before is not None and after is None:
+        preceding = others.filter(model.position < before.position).order_by(model.position.desc()).first()
+        lower = preceding[0] if preceding else None
+    elif after is None and before is None:
+        last = others.order_by(model.position.desc()).first()
+        lower = last[0] if last else None
+
+    try:
+        position = key_between(lower, upper)
+    except ValueError:
+        if lower == upper:
+            # Two rows share a key (concurrent appends); respace so a retry succeeds
+            rebalance_positions(db, model)
+            raise HTTPException(status_code=409, detail="Positions were out of sync and have been rebalanced, please retry")
+        raise HTTPException(status_code=400, detail="after_id must come before before_id")
+
+    row.position = position
+    row.updated_at = datetime.utcnow()
+    db.commit()
+    db.refresh(row)
+    if needs_rebalance(position):
+        background_tasks.add_task(rebalance_in_background, model, db.info.get("tenant_id"))
+    return row
+
+def set_archived(db: Session, model, ids: List[int], archived: bool) -> List[int]:
+    """Archive or restore rows in bulk with a single UPDATE; returns the ids that changed"""
+    state = model.archived_at.is_(None) if archived else model.archived_at.isnot(None)
+    changed = [row_id for (row_id,) in db.query(model.id).filter(model.id.in_(ids), state).all()]
+    if changed:
+        now = datetime.utcnow()
+        db.query(model).filter(model.id.in_(changed)).update(
+            {model.archived_at: now if archived else None, model.updated_at: now},
+            synchronize_session=False
+        )
+        db.commit()
+    return changed
+
+def archived_page(db: Session, model, page: int, page_size: int) -> dict:
+    query = db.query(model).filter(model.archived_at.isnot(None))
+    items = query.order_by(model.archived_at.desc(), model.id.desc()).offset((page - 1) * page_size).limit(page_size).all()
+    return {"items": items, "total": query.count(), "page": page, "page_size": page_size}
+
+def publish_archive_change(entity: str, ids: List[int], action: str):
+    now = datetime.utcnow()
+    for row_id in ids:
+        broker.publish(entity, row_id, action, now)
 
 # Auth endpoints
 @app.post("/auth/login", response_model=Token)
-async def login(user_data: UserLogin):
-    if user_data.username == ADMIN_USERNAME and user_data.password == ADMIN_PASSWORD:
+async def login(user_data: UserLogin, request: Request):
+    tenant_id = request_tenant(request) or DEFAULT_TENANT_ID
+    if tenant_id == DEFAULT_TENANT_ID:
+        valid = user_data.username == ADMIN_USERNAME and user_data.password == ADMIN_PASSWORD
+    else:
+        valid = await run_in_threadpool(verify_tenant_admin, tenant_id, user_data.username, user_data.password)
+    if valid:
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
-            data={"sub": user_data.username}, expires_delta=access_token_expires
+            data={"sub": user_data.username, "tenant": tenant_id},
+            expires_delta=access_token_expires
         )
         return {"access_token": access_token, "token_type": "bearer"}
     else:
@@ -102,20 +291,46 @@ async def login(user_data: UserLogin):
 
 # Public endpoints
 @app.get("/", response_model=PortfolioData)
-async def get_portfolio_data(db: Session = Depends(get_db)):
+async def get_portfolio_data(request: Request, min_version: Optional[str] = None):
     """Get all portfolio data for public view"""
-    
+    # Served from a per-tenant snapshot; concurrent misses wait on a single rebuild.
+    # min_version comes from a change notification and rules out snapshots older than that change.
+    tenant_id = request_tenant(request)
+    tenant = tenant_id or DEFAULT_TENANT_ID
+    if request.headers.get("authorization"):
+        # The admin dashboard reloads right after each write and must see it. Skipping the stale
+        # path costs at most one shared rebuild per write, so the token need not be verified here.
+        min_version = portfolio_cache.version_token(tenant)
+    payload = await portfolio_cache.get(
+        "portfolio",
+        lambda: build_portfolio_payload(tenant_id),
+        tenant=tenant,
+        min_version=parse_version_token(min_version),
+    )
+    return Response(content=payload, media_type="application/json")
+
+def build_portfolio_payload(tenant_id: Optional[int] = None) -> bytes:
+    """Query everything GET / returns and serialize it once"""
+    db = tenant_session(tenant_id)
+    try:
+        return query_portfolio_data(db).model_dump_json().encode()
+    finally:
+        db.close()
+
+def query_portfolio_data(db: Session) -> PortfolioData:
     # Get hero data
     hero = db.query(Hero).first()
     
     # Get featured projects
-    featured_projects = db.query(Project).filter(Project.is_featured == 1).all()
+    featured_projects = db.query(Project).filter(
+        Project.archived_at.is_(None), Project.is_featured == 1
+    ).order_by(Project.position, Project.id).all()
     
     # Get all projects
-    projects = db.query(Project).all()
+    projects = db.query(Project).filter(Project.archived_at.is_(None)).order_by(Project.position, Project.id).all()
     
     # Get experiences
-    experiences = db.query(Experience).all()
+    experiences = db.query(Experience).filter(Experience.archived_at.is_(None)).order_by(Experience.position, Experience.id).all()
     
     # Get settings
     settings = db.query(Settings).first()
@@ -141,6 +356,17 @@ async def get_portfolio_data(db: Session = Depends(get_db)):
         settings=settings
     )
 
+# Live change notifications
+@app.get("/events")
+async def stream_events():
+    """Server-Sent Events stream of compact change notifications"""
+    subscriber = broker.subscribe()
+    return StreamingResponse(
+        broker.stream(subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 # Hero endpoints
 @app.get("/hero", response_model=Optional[HeroSchema])
 async def get_hero(db: Session = Depends(get_db)):
@@ -157,11 +383,19 @@ async def create_or_update_hero(
     
     if existing_hero:
         # Update existing hero
+        image_changed = existing_hero.profile_image != hero_data.profile_image
+        if image_changed:
+            set_placeholder(existing_hero, "hero", None)
         for field, value in hero_data.dict().items():
             setattr(existing_hero, field, value)
         existing_hero.updated_at = datetime.utcnow()
         db.commit()
         db.refresh(existing_hero)
+        broker.publish("hero", existing_hero.id, "updated", existing_hero.updated_at)
+        if image_changed:
+            if existing_hero.profile_image:
+                enqueue(db, "compute_image_placeholder", {"entity": "hero", "id": existing_hero.id})
+            enqueue(db, "cleanup_orphaned_uploads")
         return existing_hero
     else:
         # Create new hero
@@ -169,6 +403,9 @@ async def create_or_update_hero(
         db.add(db_hero)
         db.commit()
         db.refresh(db_hero)
+        broker.publish("hero", db_hero.id, "created", db_hero.updated_at)
+        if db_hero.profile_image:
+            enqueue(db, "compute_image_placeholder", {"entity": "hero", "id": db_hero.id})
         return db_hero
 
 # Project endpoints
@@ -177,10 +414,10 @@ async def get_projects(
     featured_only: bool = False,
     db: Session = Depends(get_db)
 ):
-    query = db.query(Project)
+    query = db.query(Project).filter(Project.archived_at.is_(None))
     if featured_only:
         query = query.filter(Project.is_featured == 1)
-    return query.all()
+    return query.order_by(Project.position, Project.id).all()
 
 @app.post("/projects", response_model=ProjectSchema)
 async def create_project(
@@ -192,10 +429,14 @@ async def create_project(
     # Convert boolean to integer for SQLite
     project_dict['is_featured'] = 1 if project_dict.get('is_featured') else 0
     
-    db_project = Project(**project_dict)
+    db_project = Project(**project_dict, position=next_position(db, Project))
     db.add(db_project)
     db.commit()
     db.refresh(db_project)
+    broker.publish("project", db_project.id, "created", db_project.updated_at)
+    analytics.max_project_id = max(analytics.max_project_id, db_project.id)
+    if db_project.image:
+        enqueue(db, "compute_image_placeholder", {"entity": "project", "id": db_project.id})
     return db_project
 
 @app.put("/projects/{project_id}", response_model=ProjectSchema)
@@ -212,6 +453,9 @@ async def update_project(
     update_data = project_data.dict(exclude_unset=True)
     if 'is_featured' in update_data:
         update_data['is_featured'] = 1 if update_data['is_featured'] else 0
+    image_changed = 'image' in update_data and update_data['image'] != db_project.image
+    if image_changed:
+        set_placeholder(db_project, "project", None)
     
     for field, value in update_data.items():
         setattr(db_project, field, value)
@@ -219,6 +463,11 @@ async def update_project(
     db_project.updated_at = datetime.utcnow()
     db.commit()
     db.refresh(db_project)
+    broker.publish("project", db_project.id, "updated", db_project.updated_at)
+    if image_changed:
+        if db_project.image:
+            enqueue(db, "compute_image_placeholder", {"entity": "project", "id": db_project.id})
+        enqueue(db, "cleanup_orphaned_uploads")
     return db_project
 
 @app.delete("/projects/{project_id}")
@@ -233,12 +482,57 @@ async def delete_project(
     
     db.delete(db_project)
     db.commit()
+    broker.publish("project", project_id, "deleted", datetime.utcnow())
+    enqueue(db, "cleanup_orphaned_uploads")
     return {"message": "Project deleted successfully"}
 
+@app.patch("/projects/{project_id}/move", response_model=ProjectSchema)
+def move_project(
+    project_id: int,
+    move: MoveRequest,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: str = Depends(verify_token)
+):
+    """Move a project between two neighbours, rewriting only its own row"""
+    db_project = move_row(db, Project, project_id, move, background_tasks)
+    broker.publish("project", db_project.id, "updated", db_project.updated_at)
+    return db_project
+
+@app.get("/projects/archived", response_model=ProjectArchivePage)
+def get_archived_projects(
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: str = Depends(verify_token)
+):
+    """Paginated list of archived projects, most recently archived first"""
+    return archived_page(db, Project, page, page_size)
+
+@app.post("/projects/archive", response_model=ArchiveResult)
+def archive_projects(
+    request: ArchiveRequest,
+    db: Session = Depends(get_db),
+    current_user: str = Depends(verify_token)
+):
+    ids = set_archived(db, Project, request.ids, archived=True)
+    publish_archive_change("project", ids, "archived")
+    return {"message": f"{len(ids)} project(s) archived", "ids": ids}
+
+@app.post("/projects/restore", response_model=ArchiveResult)
+def restore_projects(
+    request: ArchiveRequest,
+    db: Session = Depends(get_db),
+    current_user: str = Depends(verify_token)
+):
+    ids = set_archived(db, Project, request.ids, archived=False)
+    publish_archive_change("project", ids, "restored")
+    return {"message": f"{len(ids)} project(s) restored", "ids": ids}
+
 # Experience endpoints
 @app.get("/experiences", response_model=List[ExperienceSchema])
 async def get_experiences(db: Session = Depends(get_db)):
-    return db.query(Experience).all()
+    return db.query(Experience).filter(Experience.archived_at.is_(None)).order_by(Experience.position, Experience.id).all()
 
 @app.post("/experiences", response_model=ExperienceSchema)
 async def create_experience(
@@ -246,10 +540,11 @@ async def create_experience(
     db: Session = Depends(get_db),
     current_user: str = Depends(verify_token)
 ):
-    db_experience = Experience(**experience_data.dict())
+    db_experience = Experience(**experience_data.dict(), position=next_position(db, Experience))
     db.add(db_experience)
     db.commit()
     db.refresh(db_experience)
+    broker.publish("experience", db_experience.id, "created", db_experience.updated_at)
     return db_experience
 
 @app.put("/experiences/{experience_id}", response_model=ExperienceSchema)
@@ -270,6 +565,7 @@ async def update_experience(
     db_experience.updated_at = datetime.utcnow()
     db.commit()
     db.refresh(db_experience)
+    broker.publish("experience", db_experience.id, "updated", db_experience.updated_at)
     return db_experience
 
 @app.delete("/experiences/{experience_id}")
@@ -284,8 +580,52 @@ async def delete_experience(
     
     db.delete(db_experience)
     db.commit()
+    broker.publish("experience", experience_id, "deleted", datetime.utcnow())
     return {"message": "Experience deleted successfully"}
 
+@app.patch("/experiences/{experience_id}/move", response_model=ExperienceSchema)
+def move_experience(
+    experience_id: int,
+    move: MoveRequest,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: str = Depends(verify_token)
+):
+    """Move an experience between two neighbours, rewriting only its own row"""
+    db_experience = move_row(db, Experience, experience_id, move, background_tasks)
+    broker.publish("experience", db_experience.id, "updated", db_experience.updated_at)
+    return db_experience
+
+@app.get("/experiences/archived", response_model=ExperienceArchivePage)
+def get_archived_experiences(
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: str = Depends(verify_token)
+):
+    """Paginated list of archived experiences, most recently archived first"""
+    return archived_page(db, Experience, page, page_size)
+
+@app.post("/experiences/archive", response_model=ArchiveResult)
+def archive_experiences(
+    request: ArchiveRequest,
+    db: Session = Depends(get_db),
+    current_user: str = Depends(verify_token)
+):
+    ids = set_archived(db, Experience, request.ids, archived=True)
+    publish_archive_change("experience", ids, "archived")
+    return {"message": f"{len(ids)} experience(s) archived", "ids": ids}
+
+@app.post("/experiences/restore", response_model=ArchiveResult)
+def restore_experiences(
+    request: ArchiveRequest,
+    db: Session = Depends(get_db),
+    current_user: str = Depends(verify_token)
+):
+    ids = set_archived(db, Experience, request.ids, archived=False)
+    publish_archive_change("experience", ids, "restored")
+    return {"message": f"{len(ids)} experience(s) restored", "ids": ids}
+
 # Settings endpoints
 @app.get("/settings", response_model=SettingsSchema)
 async def get_settings(db: Session = Depends(get_db)):
@@ -326,50 +666,104 @@ async def update_settings(
     db_settings.updated_at = datetime.utcnow()
     db.commit()
     db.refresh(db_settings)
+    broker.publish("settings", db_settings.id, "updated", db_settings.updated_at)
     return db_settings
 
 
-# File Upload Endpoint
+# Resized image variants
+@app.get("/img/{key:path}")
+async def get_image_variant(
+    key: str,
+    w: Optional[int] = Query(None, ge=1, le=IMAGE_MAX_DIMENSION),
+    h: Optional[int] = Query(None, ge=1, le=IMAGE_MAX_DIMENSION),
+    fmt: str = "webp"
+):
+    """Serve `key` resized to fit w x h and re-encoded as fmt, from the variant cache"""
+    if fmt not in TRANSFORM_FORMATS:
+        raise HTTPException(status_code=400, detail=f"fmt must be one of: {', '.join(TRANSFORM_FORMATS)}")
+    try:
+        path = await image_variants.get(key, w, h, fmt)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Image not found")
+    except Exception:
+        # No details: they would tell callers what the origin or filesystem holds
+        raise HTTPException(status_code=502, detail="Could not produce image")
+    return FileResponse(
+        path,
+        media_type=f"image/{'jpeg' if fmt == 'jpg' else fmt}",
+        headers={"Cache-Control": "public, max-age=86400"},
+    )
+
+# File Upload Endpoints
+def validate_upload(content_type: Optional[str], size: Optional[int]):
+    if not content_type or not content_type.startswith('image/'):
+        raise HTTPException(
+            status_code=400,
+            detail="Only image files are allowed"
+        )
+    if size is not None and size > MAX_UPLOAD_BYTES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"File size must be less than {MAX_UPLOAD_BYTES // (1024 * 1024)}MB"
+        )
+
+def new_upload_key(filename: str) -> str:
+    file_extension = filename.split('.')[-1] if '.' in filename else 'jpg'
+    return f"{uuid.uuid4()}.{file_extension}"
+
 @app.post("/upload")
 async def upload_file(
     file: UploadFile = File(...),
     current_user: str = Depends(verify_token)
 ):
-    """Upload an image file and return the URL"""
+    """Upload an image file through the API and return the URL (prefer /upload/presign)"""
     try:
-        # Validate file type
-        if not file.content_type.startswith('image/'):
-            raise HTTPException(
-                status_code=400,
-                detail="Only image files are allowed"
-            )
-        
-        # Validate file size (max 5MB)
+        validate_upload(file.content_type, None)
         contents = await file.read()
-        if len(contents) > 5 * 1024 * 1024:
-            raise HTTPException(
-                status_code=400,
-                detail="File size must be less than 5MB"
-            )
+        validate_upload(file.content_type, len(contents))
         
-        # Generate unique filename
-        file_extension = file.filename.split('.')[-1] if '.' in file.filename else 'jpg'
-        unique_filename = f"{uuid.uuid4()}.{file_extension}"
-        file_path = UPLOAD_DIR / unique_filename
-        
-        # Save the file
-        with open(file_path, "wb") as buffer:
-            buffer.write(contents)
-        
-        # Return the URL path
-        file_url = f"/uploads/{unique_filename}"
-        return {"message": "File uploaded successfully", "file_url": file_url}
+        key = new_upload_key(file.filename)
+        await run_in_threadpool(storage.save, key, contents, file.content_type)
+        return {"message": "File uploaded successfully", "file_url": storage.url_for(key)}
     
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Could not upload file: {str(e)}")
 
+@app.post("/upload/presign", response_model=PresignResponse)
+def presign_upload(
+    request: PresignRequest,
+    current_user: str = Depends(verify_token)
+):
+    """Issue a short-lived URL the browser can PUT the image to directly"""
+    validate_upload(request.content_type, request.size)
+    key = new_upload_key(request.filename)
+    return {
+        "key": key,
+        "upload_url": storage.presign_put(key, request.content_type, request.size),
+        "method": "PUT",
+        "headers": {"Content-Type": request.content_type},
+        "file_url": storage.url_for(key),
+    }
+
+@app.put("/storage/{key:path}", status_code=201)
+async def put_presigned_upload(key: str, size: int, expires: int, signature: str, request: Request):
+    """Target of local-storage presigned URLs (S3 uploads never reach the API)"""
+    content_type = request.headers.get("content-type", "")
+    if not isinstance(storage, LocalStorage) or not storage.verify_signature(key, content_type, size, expires, signature):
+        raise HTTPException(status_code=403, detail="Invalid or expired upload URL")
+    validate_upload(content_type, size)
+    contents = bytearray()
+    async for chunk in request.stream():
+        contents.extend(chunk)
+        if len(contents) > size:
+            raise HTTPException(status_code=400, detail="Upload is larger than the size it was signed for")
+    if len(contents) != size:
+        raise HTTPException(status_code=400, detail="Upload is smaller than the size it was signed for")
+    await run_in_threadpool(storage.save, key, bytes(contents), content_type)
+    return {"message": "File uploaded successfully", "file_url": storage.url_for(key)}
+
 
 # Toggle Project Featured Status
 @app.patch("/projects/{project_id}/toggle-featured")
@@ -389,6 +783,7 @@ def toggle_project_featured(
     
     db.commit()
     db.refresh(project)
+    broker.publish("project", project.id, "updated", project.updated_at)
     
     return {
         "message": "Featured status updated successfully",
@@ -396,6 +791,327 @@ def toggle_project_featured(
         "is_featured": project.is_featured
     }
 
+
+# Batch endpoint
+BATCH_ENTITIES = {
+    "project": (Project, ProjectCreate, ProjectUpdate),
+    "experience": (Experience, ExperienceCreate, ExperienceUpdate),
+    "hero": (Hero, HeroCreate, HeroUpdate),
+    "settings": (Settings, SettingsCreate, SettingsUpdate),
+}
+
+BATCH_ALLOWED_OPS = {
+    "project": {"create", "update", "delete", "toggle_featured"},
+    "experience": {"create", "update", "delete"},
+    "hero": {"create", "update"},
+    "settings": {"update"},
+}
+
+def not_nullable_nulls(model, payload: dict) -> List[str]:
+    """Fields of `payload` set to None whose column is NOT NULL"""
+    columns = model.__table__.columns
+    return [field for field, value in payload.items() if value is None and field in columns and not columns[field].nullable]
+
+@app.post("/batch", response_model=BatchResponse)
+def apply_batch(
+    batch: BatchRequest,
+    db: Session = Depends(get_db),
+    current_user: str = Depends(verify_token)
+):
+    """Validate a list of operations, then apply them all with a single commit"""
+    operations = batch.operations
+    results = [
+        BatchOperationResult(index=i, op=op.op, entity=op.entity, id=op.id)
+        for i, op in enumerate(operations)
+    ]
+
+    # Load every referenced row up front: one query per entity type
+    rows = {}
+    for entity in ("project", "experience"):
+        ids = {op.id for op in operations if op.entity == entity and op.id is not None}
+        model = BATCH_ENTITIES[entity][0]
+        rows[entity] = {row.id: row for row in db.query(model).filter(model.id.in_(ids)).all()} if ids else {}
+    hero = db.query(Hero).first() if any(op.entity == "hero" for op in operations) else None
+    settings = db.query(Settings).first() if any(op.entity == "settings" for op in operations) else None
+
+    # Validation pass: nothing is written unless every operation is valid
+    payloads = []
+    deleted = set()
+    for op, result in zip(operations, results):
+        payload = None
+        model, create_schema, update_schema = BATCH_ENTITIES[op.entity]
+        try:
+            if op.op not in BATCH_ALLOWED_OPS[op.entity]:
+                raise ValueError(f"Operation '{op.op}' is not supported for {op.entity}")
+            if op.op == "create":
+                payload = create_schema(**(op.data or {})).dict()
+            elif op.op == "update":
+                payload = update_schema(**(op.data or {})).dict(exclude_unset=True)
+            if payload:
+                # The *Update schemas are all-Optional; an explicit null must not reach a NOT NULL column
+                null_fields = not_nullable_nulls(model, payload)
+                if null_fields:
+                    raise ValueError("; ".join(f"{field}: may not be null" for field in null_fields))
+            if op.entity in rows and op.op != "create":
+                if op.id is None:
+                    raise ValueError("An id is required")
+                if op.id not in rows[op.entity] or (op.entity, op.id) in deleted:
+                    raise ValueError(f"{op.entity.capitalize()} not found")
+                if op.op == "delete":
+                    deleted.add((op.entity, op.id))
+            if op.entity == "hero" and op.op == "update" and hero is None:
+                raise ValueError("Hero not found")
+        except ValidationError as e:
+            result.status = "error"
+            result.error = "; ".join(
+                f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in e.errors()
+            )
+        except ValueError as e:
+            result.status = "error"
+            result.error = str(e)
+        payloads.append(payload)
+
+    if any(result.status == "error" for result in results):
+        raise HTTPException(
+            status_code=400,
+            detail=[result.dict() for result in results]
+        )
+
+    # Apply pass
+    touched = []
+    append_positions = {}
+    image_rows = []
+    try:
+        for op, payload, result in zip(operations, payloads, results):
+            now = datetime.utcnow()
+            if op.entity == "project" and payload and "is_featured" in payload:
+                # Convert boolean to integer for SQLite
+                payload["is_featured"] = 1 if payload["is_featured"] else 0
+
+            if op.entity in rows:
+                if op.op == "create":
+                    model = BATCH_ENTITIES[op.entity][0]
+                    # New rows are not flushed yet, so chain append keys in memory
+                    last = append_positions.get(op.entity)
+                    position = key_between(last, None) if last else next_position(db, model)
+                    append_positions[op.entity] = position
+                    row = model(**payload, position=position)
+                    db.add(row)
+                    if op.entity == "project" and row.image:
+                        image_rows.append((op.entity, row))
+                else:
+                    row = rows[op.entity][op.id]
+                    if op.op == "delete":
+                        db.delete(row)
+                    elif op.op == "toggle_featured":
+                        row.is_featured = 0 if row.is_featured else 1
+                        row.updated_at = now
+                    else:
+                        if op.entity == "project" and "image" in payload and payload["image"] != row.image:
+                            set_placeholder(row, "project", None)
+                            image_rows.append((op.entity, row))
+                        for field, value in payload.items():
+                            setattr(row, field, value)
+                        row.updated_at = now
+            elif op.entity == "hero":
+                if hero is None:
+                    hero = Hero(**payload)
+                    db.add(hero)
+                    image_rows.append((op.entity, hero))
+                else:
+                    if "profile_image" in payload and payload["profile_image"] != hero.profile_image:
+                        set_placeholder(hero, "hero", None)
+                        image_rows.append((op.entity, hero))
+                    for field, value in payload.items():
+                        setattr(hero, field, value)
+                    hero.updated_at = now
+                row = hero
+            else:
+                if settings is None:
+                    settings = Settings(font_size="medium", theme="light")
+                    db.add(settings)
+                for field, value in payload.items():
+                    setattr(settings, field, value)
+                settings.updated_at = now
+                row = settings
+            touched.append((op, row, result, now))
+
+        db.flush()
+        # Capture ids and timestamps before commit expires the instances
+        notifications = []
+        for op, row, result, now in touched:
+            result.id = op.id if op.op == "delete" else row.id
+            action = {"create": "created", "delete": "deleted"}.get(op.op, "updated")
+            notifications.append((op.entity, result.id, action, now if op.op == "delete" else row.updated_at))
+        placeholder_jobs = {
+            (entity, row.id) for entity, row in image_rows
+            if row not in db.deleted and getattr(row, IMAGE_FIELDS[entity][1])
+        }
+        db.commit()
+    except Exception:
+        db.rollback()
+        # The exception text can carry SQL and bound parameters; keep it in the log
+        logger.exception("Applying batch failed")
+        raise HTTPException(status_code=500, detail="Could not apply batch")
+
+    for notification in notifications:
+        broker.publish(*notification)
+    created_projects = [result.id for op, _, result, _ in touched if op.entity == "project" and op.op == "create"]
+    if created_projects:
+        analytics.max_project_id = max(analytics.max_project_id, *created_projects)
+    for entity, row_id in placeholder_jobs:
+        enqueue(db, "compute_image_placeholder", {"entity": entity, "id": row_id})
+    if image_rows or any(op.entity == "project" and op.op == "delete" for op in operations):
+        enqueue(db, "cleanup_orphaned_uploads")
+
+    return BatchResponse(results=results)
+
+# Analytics endpoints
+@app.post("/analytics/events", status_code=202)
+async def ingest_analytics(batch: AnalyticsBatch):
+    """Count project views and link clicks (buffered in memory, flushed periodically)"""
+    accepted = sum(analytics.record(event.project_id, event.kind) for event in batch.events)
+    return {"accepted": accepted}
+
+@app.get("/analytics/projects", response_model=List[ProjectStats])
+def get_project_analytics(
+    days: int = Query(30, ge=1, le=3650),
+    db: Session = Depends(get_db),
+    current_user: str = Depends(verify_token)
+):
+    """Per-project totals over the last `days` days, most viewed first"""
+    since = datetime.utcnow().date() - timedelta(days=days - 1)
+    rows = db.query(
+        ProjectStat.project_id,
+        Project.title,
+        func.sum(ProjectStat.views).label("views"),
+        func.sum(ProjectStat.live_clicks).label("live_clicks"),
+        func.sum(ProjectStat.github_clicks).label("github_clicks"),
+    ).outerjoin(Project, Project.id == ProjectStat.project_id).filter(
+        ProjectStat.day >= since
+    )
+    if MULTI_TENANT:
+        # Stats rows carry no tenant; only those of this tenant's (surviving) projects are visible
+        rows = rows.filter(Project.id.isnot(None))
+    rows = rows.group_by(ProjectStat.project_id, Project.title).order_by(func.sum(ProjectStat.views).desc()).all()
+    return [row._asdict() for row in rows]
+
+@app.get("/analytics/projects/{project_id}", response_model=List[ProjectDailyStats])
+def get_project_daily_analytics(
+    project_id: int,
+    days: int = Query(30, ge=1, le=3650),
+    db: Session = Depends(get_db),
+    current_user: str = Depends(verify_token)
+):
+    """Daily counts for one project over the last `days` days"""
+    if MULTI_TENANT and not db.query(Project.id).filter(Project.id == project_id).first():
+        raise HTTPException(status_code=404, detail="Project not found")
+    since = datetime.utcnow().date() - timedelta(days=days - 1)
+    return db.query(ProjectStat).filter(
+        ProjectStat.project_id == project_id, ProjectStat.day >= since
+    ).order_by(ProjectStat.day).all()
+
+# Admission control metrics
+@app.get("/metrics/admission")
+def get_admission_metrics(current_user: str = Depends(verify_operator_token)):
+    """Concurrency, queue depth and rejected request counts"""
+    return admission.metrics()
+
+# Background job status
+@app.get("/jobs", response_model=List[JobSchema])
+def list_jobs(
+    job_status: Optional[str] = Query(None, alias="status"),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_user: str = Depends(verify_operator_token)
+):
+    """Most recent background jobs, optionally filtered by status"""
+    query = db.query(Job)
+    if job_status:
+        query = query.filter(Job.status == job_status)
+    return query.order_by(Job.id.desc()).limit(limit).all()
+
+@app.get("/jobs/{job_id}", response_model=JobSchema)
+def get_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: str = Depends(verify_operator_token)
+):
+    job = db.get(Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+# Database backups (restore is CLI only: python backup.py restore <snapshot>)
+@app.post("/backups", response_model=JobSchema, status_code=202)
+def queue_backup(
+    db: Session = Depends(get_db),
+    current_user: str = Depends(verify_operator_token)
+):
+    """Take an online snapshot in the background; poll /jobs/{id} for the outcome"""
+    return enqueue(db, "create_backup")
+
+@app.get("/backups", response_model=List[BackupSchema])
+def get_backups(current_user: str = Depends(verify_operator_token)):
+    """Existing snapshots, newest first"""
+    return [
+        {"name": path.name, "size": stat.st_size, "created_at": datetime.utcfromtimestamp(stat.st_mtime)}
+        for path, stat in ((path, path.stat()) for path in list_backups())
+    ]
+
+# Profiling (only when PROFILING_ENABLED)
+def require_profiling():
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+
+def profile_response(counts, name: str, fmt: str) -> Response:
+    if fmt == "folded":
+        return Response(to_folded(counts), media_type="text/plain", headers={
+            "Content-Disposition": f'attachment; filename="{name}.folded.txt"'
+        })
+    return Response(json.dumps(to_speedscope(counts, name, PROFILE_SAMPLE_INTERVAL_MS)), media_type="application/json", headers={
+        "Content-Disposition": f'attachment; filename="{name}.speedscope.json"'
+    })
+
+@app.post("/profile")
+async def run_profile(
+    seconds: float = Query(10, gt=0, le=PROFILE_MAX_SECONDS),
+    fmt: str = Query("speedscope", pattern="^(speedscope|folded)$"),
+    current_user: str = Depends(verify_operator_token)
+):
+    """Sample every thread for `seconds` and return a speedscope file or folded stacks"""
+    require_profiling()
+    try:
+        counts = await profile_for(seconds)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return profile_response(counts, f"profile-{datetime.utcnow():%Y%m%dT%H%M%S}", fmt)
+
+@app.get("/profile/slow")
+def list_slow_requests(current_user: str = Depends(verify_operator_token)):
+    """Captured slow requests, newest first"""
+    require_profiling()
+    return slow_requests.summaries()
+
+@app.get("/profile/slow/{capture_id}")
+def get_slow_request(
+    capture_id: int,
+    fmt: str = Query("json", pattern="^(json|speedscope|folded)$"),
+    current_user: str = Depends(verify_operator_token)
+):
+    """One capture: SQL statement log plus stacks sampled while it was over the threshold"""
+    require_profiling()
+    capture = slow_requests.get(capture_id)
+    if capture is None:
+        raise HTTPException(status_code=404, detail="Capture not found (it may have been evicted)")
+    stacks = capture["stacks"].copy()
+    if fmt != "json":
+        return profile_response(stacks, f"slow-request-{capture_id}", fmt)
+    return {
+        **{key: value for key, value in capture.items() if key != "stacks"},
+        "stacks": to_folded(stacks).splitlines(),
+    }
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -85,6 +85,52 @@ def run_migration():
             )
         """)
         
+        # Background jobs table
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY,
+                kind VARCHAR(100) NOT NULL,
+                payload TEXT,
+                dedupe_key VARCHAR(64) NOT NULL,
+                status VARCHAR(20) NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL DEFAULT 5,
+                run_after DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                last_error TEXT,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_jobs_dedupe_key ON jobs (dedupe_key)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_jobs_status_run_after ON jobs (status, run_after)")
+        
+        # Analytics rollup table
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS project_stats_daily (
+                day DATE NOT NULL,
+                project_id INTEGER NOT NULL,
+                views INTEGER NOT NULL DEFAULT 0,
+                live_clicks INTEGER NOT NULL DEFAULT 0,
+                github_clicks INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (day, project_id)
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_project_stats_daily_project_id ON project_stats_daily (project_id)")
+        
+        # Tenants table (multi-tenant mode; tenant 1 owns all pre-existing rows)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS tenants (
+                id INTEGER PRIMARY KEY,
+                slug VARCHAR(64) NOT NULL UNIQUE,
+                host VARCHAR(255) UNIQUE,
+                name VARCHAR(200),
+                admin_username VARCHAR(100),
+                admin_password_hash VARCHAR(255),
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("INSERT OR IGNORE INTO tenants (id, slug, name) VALUES (1, 'default', 'Default portfolio')")
+        
         # Check if we need to add new columns to existing tables
         print("Checking for missing columns...")
         
@@ -120,6 +166,13 @@ def run_migration():
             heroes_columns = get_columns('heroes')
             new_columns = []
             
+            for column in ('profile_image_width', 'profile_image_height'):
+                if column not in heroes_columns:
+                    new_columns.append(f"ALTER TABLE heroes ADD COLUMN {column} INTEGER")
+            if 'profile_image_color' not in heroes_columns:
+                new_columns.append("ALTER TABLE heroes ADD COLUMN profile_image_color VARCHAR(7)")
+            if 'profile_image_placeholder' not in heroes_columns:
+                new_columns.append("ALTER TABLE heroes ADD COLUMN profile_image_placeholder TEXT")
             if 'created_at' not in heroes_columns:
                 new_columns.append("ALTER TABLE heroes ADD COLUMN created_at DATETIME DEFAULT CURRENT_TIMESTAMP")
             if 'updated_at' not in heroes_columns:
@@ -136,6 +189,17 @@ def run_migration():
             
             if 'is_featured' not in projects_columns:
                 new_columns.append("ALTER TABLE projects ADD COLUMN is_featured INTEGER DEFAULT 0")
+            for column in ('image_width', 'image_height'):
+                if column not in projects_columns:
+                    new_columns.append(f"ALTER TABLE projects ADD COLUMN {column} INTEGER")
+            if 'image_color' not in projects_columns:
+                new_columns.append("ALTER TABLE projects ADD COLUMN image_color VARCHAR(7)")
+            if 'image_placeholder' not in projects_columns:
+                new_columns.append("ALTER TABLE projects ADD COLUMN image_placeholder TEXT")
+            if 'position' not in projects_columns:
+                new_columns.append("ALTER TABLE projects ADD COLUMN position VARCHAR(64)")
+            if 'archived_at' not in projects_columns:
+                new_columns.append("ALTER TABLE projects ADD COLUMN archived_at DATETIME")
             if 'created_at' not in projects_columns:
                 new_columns.append("ALTER TABLE projects ADD COLUMN created_at DATETIME DEFAULT CURRENT_TIMESTAMP")
             if 'updated_at' not in projects_columns:
@@ -150,6 +214,10 @@ def run_migration():
             experiences_columns = get_columns('experiences')
             new_columns = []
             
+            if 'position' not in experiences_columns:
+                new_columns.append("ALTER TABLE experiences ADD COLUMN position VARCHAR(64)")
+            if 'archived_at' not in experiences_columns:
+                new_columns.append("ALTER TABLE experiences ADD COLUMN archived_at DATETIME")
             if 'created_at' not in experiences_columns:
                 new_columns.append("ALTER TABLE experiences ADD COLUMN created_at DATETIME DEFAULT CURRENT_TIMESTAMP")
             if 'updated_at' not in experiences_columns:
@@ -159,6 +227,29 @@ def run_migration():
                 print(f"Adding column: {column_sql}")
                 cursor.execute(column_sql)
         
+        # Every portfolio row belongs to a tenant
+        for table in ('settings', 'heroes', 'projects', 'experiences'):
+            if 'tenant_id' not in get_columns(table):
+                column_sql = f"ALTER TABLE {table} ADD COLUMN tenant_id INTEGER NOT NULL DEFAULT 1"
+                print(f"Adding column: {column_sql}")
+                cursor.execute(column_sql)
+        
+        # Indexes for ORDER BY position within a tenant (positions are backfilled by the app on startup)
+        print("Creating indexes...")
+        for index in ('ix_projects_position', 'ix_experiences_position',
+                      'ix_projects_active_position', 'ix_experiences_active_position'):
+            # Superseded by the tenant-prefixed indexes below
+            cursor.execute(f"DROP INDEX IF EXISTS {index}")
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_settings_tenant_id ON settings (tenant_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_heroes_tenant_id ON heroes (tenant_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_projects_tenant_position ON projects (tenant_id, position)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_experiences_tenant_position ON experiences (tenant_id, position)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_projects_tenant_archived_at ON projects (tenant_id, archived_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_experiences_tenant_archived_at ON experiences (tenant_id, archived_at)")
+        # Partial indexes so public queries skip archived rows
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_projects_tenant_active_position ON projects (tenant_id, position) WHERE archived_at IS NULL")
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_experiences_tenant_active_position ON experiences (tenant_id, position) WHERE archived_at IS NULL")
+        
         # Insert default settings if none exist
         cursor.execute("SELECT COUNT(*) FROM settings")
         if cursor.fetchone()[0] == 0:
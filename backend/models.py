@@ -1,13 +1,31 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, Date, JSON, Boolean, Index
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 
 Base = declarative_base()
 
+# Fractional rank keys (see ordering.py) must sort byte-wise; SQLite already does, Postgres needs the C collation
+PositionKey = String(64).with_variant(String(64, collation="C"), "postgresql")
+
+# Rows created before multi-tenant mode (and everything in single-tenant mode) belong here
+DEFAULT_TENANT_ID = 1
+
+class Tenant(Base):
+    __tablename__ = "tenants"
+
+    id = Column(Integer, primary_key=True, index=True)
+    slug = Column(String(64), unique=True, nullable=False)  # path prefix: /t/{slug}/...
+    host = Column(String(255), unique=True, nullable=True)  # e.g. jane.example.com
+    name = Column(String(200), nullable=True)
+    admin_username = Column(String(100), nullable=True)  # default tenant uses ADMIN_USERNAME
+    admin_password_hash = Column(String(255), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
 class Settings(Base):
     __tablename__ = "settings"
     
     id = Column(Integer, primary_key=True, index=True)
+    tenant_id = Column(Integer, nullable=False, default=DEFAULT_TENANT_ID, server_default=str(DEFAULT_TENANT_ID), index=True)
     font_size = Column(String(10), default="medium")  # small, medium, large, extra-large
     theme = Column(String(10), default="light")  # light, dark
     email = Column(String(255), nullable=True)
@@ -21,10 +39,16 @@ class Hero(Base):
     __tablename__ = "heroes"
     
     id = Column(Integer, primary_key=True, index=True)
+    tenant_id = Column(Integer, nullable=False, default=DEFAULT_TENANT_ID, server_default=str(DEFAULT_TENANT_ID), index=True)
     name = Column(String(100), nullable=False)
     title = Column(String(200), nullable=False)
     description = Column(Text, nullable=False)
     profile_image = Column(String(500), nullable=True)
+    # Placeholder metadata, computed in the background (see images.py)
+    profile_image_width = Column(Integer, nullable=True)
+    profile_image_height = Column(Integer, nullable=True)
+    profile_image_color = Column(String(7), nullable=True)  # #rrggbb
+    profile_image_placeholder = Column(Text, nullable=True)  # base64 data URI
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -32,25 +56,80 @@ class Project(Base):
     __tablename__ = "projects"
     
     id = Column(Integer, primary_key=True, index=True)
+    tenant_id = Column(Integer, nullable=False, default=DEFAULT_TENANT_ID, server_default=str(DEFAULT_TENANT_ID))
     title = Column(String(200), nullable=False)
     description = Column(Text, nullable=False)
     image = Column(String(500), nullable=True)
+    # Placeholder metadata, computed in the background (see images.py)
+    image_width = Column(Integer, nullable=True)
+    image_height = Column(Integer, nullable=True)
+    image_color = Column(String(7), nullable=True)  # #rrggbb
+    image_placeholder = Column(Text, nullable=True)  # base64 data URI
     github_url = Column(String(500), nullable=True)
     live_url = Column(String(500), nullable=True)
     technologies = Column(JSON, nullable=True)  # Store as JSON array
     is_featured = Column(Integer, default=0)  # 0 = false, 1 = true
+    position = Column(PositionKey, nullable=True)  # Fractional rank key per tenant, see ordering.py
+    archived_at = Column(DateTime, nullable=True)  # NULL = active
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Partial index: public queries only ever scan one tenant's active rows
+    __table_args__ = (
+        Index("ix_projects_tenant_active_position", "tenant_id", "position",
+              sqlite_where=archived_at.is_(None), postgresql_where=archived_at.is_(None)),
+        Index("ix_projects_tenant_position", "tenant_id", "position"),
+        Index("ix_projects_tenant_archived_at", "tenant_id", "archived_at"),
+    )
+
 class Experience(Base):
     __tablename__ = "experiences"
     
     id = Column(Integer, primary_key=True, index=True)
+    tenant_id = Column(Integer, nullable=False, default=DEFAULT_TENANT_ID, server_default=str(DEFAULT_TENANT_ID))
     title = Column(String(200), nullable=False)
     company = Column(String(200), nullable=False)
     duration = Column(String(100), nullable=False)
     location = Column(String(200), nullable=True)
     description = Column(Text, nullable=True)
     skills = Column(JSON, nullable=True)  # Store as JSON array
+    position = Column(PositionKey, nullable=True)  # Fractional rank key per tenant, see ordering.py
+    archived_at = Column(DateTime, nullable=True)  # NULL = active
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
\ No newline at end of file
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_experiences_tenant_active_position", "tenant_id", "position",
+              sqlite_where=archived_at.is_(None), postgresql_where=archived_at.is_(None)),
+        Index("ix_experiences_tenant_position", "tenant_id", "position"),
+        Index("ix_experiences_tenant_archived_at", "tenant_id", "archived_at"),
+    )
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(100), nullable=False)
+    payload = Column(JSON, nullable=True)
+    dedupe_key = Column(String(64), nullable=False, index=True)  # sha256 of kind + payload
+    status = Column(String(20), default="pending", nullable=False)  # pending, running, done, failed
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=5, nullable=False)
+    run_after = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_jobs_status_run_after", "status", "run_after"),
+    )
+
+class ProjectStat(Base):
+    __tablename__ = "project_stats_daily"
+
+    # One rollup row per project per UTC day, written by analytics.py
+    day = Column(Date, primary_key=True)
+    project_id = Column(Integer, primary_key=True, index=True)
+    views = Column(Integer, default=0, nullable=False)
+    live_clicks = Column(Integer, default=0, nullable=False)
+    github_clicks = Column(Integer, default=0, nullable=False)
\ No newline at end of file
@@ -0,0 +1,129 @@
+"""
+Fractional (lexicographic) rank keys for manually ordered rows.
+
+Keys are base-62 strings compared byte-wise, so `ORDER BY position` needs
+a binary collation: SQLite's default, and the column is declared with
+COLLATE "C" on Postgres (see models.py). A key can always be generated
+between two existing keys, which means moving an item rewrites only that
+item's row. Appends count upwards at a fixed length and double the length
+when it runs out, so n appends need O(log n) characters. Keys grow slowly
+with repeated inserts at the same spot; rebalance_positions() rewrites
+them evenly once they get too long.
+"""
+
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from config import ORDERING_MAX_KEY_LENGTH
+
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+
+
+def _midpoint(a: str, b: Optional[str]) -> str:
+    """Key strictly between a and b (b=None means no upper bound). Keys never end in '0'."""
+    if b is not None:
+        # Keep any shared prefix and recurse on the remainder
+        n = 0
+        while n < len(b) and (a[n] if n < len(a) else "0") == b[n]:
+            n += 1
+        if n > 0:
+            return b[:n] + _midpoint(a[n:], b[n:])
+
+    digit_a = DIGITS.index(a[0]) if a else 0
+    digit_b = DIGITS.index(b[0]) if b is not None else BASE
+    if digit_b - digit_a > 1:
+        return DIGITS[(digit_a + digit_b) // 2]
+    if b is not None and len(b) > 1:
+        return b[0]
+    return DIGITS[digit_a] + _midpoint(a[1:], None)
+
+
+def _increment(a: str) -> Optional[str]:
+    """a + 1 as a fixed-length base-62 number, or None if a is all max digits"""
+    digits = [DIGITS.index(c) for c in a]
+    for i in reversed(range(len(digits))):
+        if digits[i] < BASE - 1:
+            digits[i] += 1
+            return "".join(DIGITS[d] for d in digits[:i + 1]) + DIGITS[0] * (len(digits) - i - 1)
+    return None
+
+
+def _key_after(a: str) -> str:
+    """Key greater than a, used for appends.
+
+    Counts upwards at a's length, skipping keys that end in '0' (nothing
+    could ever be placed before them). Only when a is all 'z' does the key
+    get longer, and then it doubles, so every length holds exponentially
+    more appends than the last.
+    """
+    if not a:
+        return _midpoint("", None)
+    key = _increment(a)
+    if key is not None and key.endswith(DIGITS[0]):
+        key = _increment(key)
+    if key is None:
+        return a + DIGITS[0] * (len(a) - 1) + DIGITS[1]
+    return key
+
+
+def key_between(before: Optional[str], after: Optional[str]) -> str:
+    """Return a key that sorts after `before` and before `after` (either may be None)"""
+    if before is not None and after is not None and before >= after:
+        raise ValueError(f"Invalid key range: {before!r} >= {after!r}")
+    if after is None:
+        return _key_after(before or "")
+    return _midpoint(before or "", after)
+
+
+def evenly_spaced_keys(count: int) -> list:
+    """Generate `count` ascending short keys, leaving headroom at the end for appends"""
+    length = 1
+    while BASE ** length < 2 * count + 2:
+        length += 1
+    span = BASE ** length
+    keys = []
+    for i in range(1, count + 1):
+        value = i * span // (2 * count + 2)
+        digits = []
+        for _ in range(length):
+            value, rem = divmod(value, BASE)
+            digits.append(DIGITS[rem])
+        keys.append("".join(reversed(digits)).rstrip("0"))
+    return keys
+
+
+def next_position(db: Session, model) -> str:
+    """Position key for appending a new row to the end of `model`'s ordering"""
+    last = db.query(model.position).filter(model.position.isnot(None)).order_by(model.position.desc()).first()
+    return key_between(last[0] if last else None, None)
+
+
+def needs_rebalance(key: str) -> bool:
+    return len(key) > ORDERING_MAX_KEY_LENGTH
+
+
+def rebalance_positions(db: Session, model):
+    """Rewrite every position of `model` with short, evenly spaced keys (keeps current order)"""
+    rows = db.query(model).order_by(model.position.is_(None), model.position, model.id).all()
+    for row, key in zip(rows, evenly_spaced_keys(len(rows))):
+        row.position = key
+    db.commit()
+
+
+def backfill_positions(db: Session, model):
+    """Append rows that have no position yet (legacy or seeded rows), in id order,
+    and respace keys left over-long by older append logic"""
+    missing = db.query(model).filter(model.position.is_(None)).order_by(model.id).all()
+    position = ""
+    if missing:
+        position = next_position(db, model)
+        for row in missing:
+            row.position = position
+            position = key_between(position, None)
+        db.commit()
+    longest = db.query(func.max(func.length(model.position))).scalar() or 0
+    if needs_rebalance(position) or longest > ORDERING_MAX_KEY_LENGTH:
+        rebalance_positions(db, model)
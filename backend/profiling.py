@@ -0,0 +1,244 @@
+"""
+Profiling hooks for production latency spikes.
+
+- profile_for(): samples every thread's stack for N seconds and returns a
+  speedscope file or folded stacks (flamegraph.pl / inferno input).
+- SlowRequestMiddleware: while a request is past SLOW_REQUEST_THRESHOLD_MS,
+  a watcher thread samples stacks on its behalf; its SQL statements are
+  logged through SQLAlchemy cursor events. Requests that finish over the
+  threshold land in a ring buffer of SLOW_REQUEST_BUFFER_SIZE captures.
+
+Nothing here is installed unless PROFILING_ENABLED is set, so a disabled
+build pays no per-request or per-query cost.
+"""
+
+import asyncio
+import contextvars
+import itertools
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event
+
+from config import (
+    SLOW_REQUEST_THRESHOLD_MS, SLOW_REQUEST_BUFFER_SIZE, SLOW_REQUEST_MAX_SQL, PROFILE_SAMPLE_INTERVAL_MS,
+)
+
+# Long-lived or self-referential routes that would always look "slow"
+UNWATCHED_PATH_PREFIXES = ("/events", "/profile")
+
+Frame = Tuple[str, str, int]  # (function, file, first line)
+
+
+def current_stacks(skip_thread: int) -> Dict[str, Tuple[Frame, ...]]:
+    """Root-first stack of every thread except `skip_thread`, keyed by thread name"""
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    stacks = {}
+    for ident, frame in sys._current_frames().items():
+        if ident == skip_thread:
+            continue
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+            frame = frame.f_back
+        stack.reverse()
+        stacks[names.get(ident, str(ident))] = tuple(stack)
+    return stacks
+
+
+def add_samples(counts: Counter, stacks: Dict[str, Tuple[Frame, ...]]):
+    for thread_name, stack in stacks.items():
+        counts[(("thread " + thread_name, "", 0),) + stack] += 1
+
+
+def to_folded(counts: Counter) -> str:
+    lines = []
+    for stack, count in counts.most_common():
+        lines.append(";".join(name if not file else f"{name} ({file}:{line})" for name, file, line in stack) + f" {count}")
+    return "\n".join(lines) + "\n"
+
+
+def to_speedscope(counts: Counter, name: str, interval_ms: float) -> dict:
+    frames, index = [], {}
+    samples, weights = [], []
+    for stack, count in counts.most_common():
+        sample = []
+        for frame in stack:
+            if frame not in index:
+                index[frame] = len(frames)
+                func, file, line = frame
+                frames.append({"name": func, "file": file, "line": line} if file else {"name": func})
+            sample.append(index[frame])
+        samples.append(sample)
+        weights.append(count * interval_ms)
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "portfolio-api",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": name,
+            "unit": "milliseconds",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": samples,
+            "weights": weights,
+        }],
+    }
+
+
+class Sampler:
+    """On-demand whole-process sampling profiler (one run at a time)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+
+    def run(self, seconds: float, interval: float) -> Counter:
+        """Blocking: sample for `seconds`, then return stack counts"""
+        if not self.lock.acquire(blocking=False):
+            raise RuntimeError("A profile is already running")
+        try:
+            counts = Counter()
+            me = threading.get_ident()
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                add_samples(counts, current_stacks(me))
+                time.sleep(interval)
+            return counts
+        finally:
+            self.lock.release()
+
+
+sampler = Sampler()
+
+
+class SlowRequestMonitor:
+    def __init__(self):
+        self.captures = deque(maxlen=SLOW_REQUEST_BUFFER_SIZE)
+        self.inflight: Dict[int, dict] = {}
+        self.ids = itertools.count(1)
+        self.thread = None
+        self.stopping = threading.Event()
+
+    def start(self):
+        if self.thread:
+            return
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._watch, name="slow-request-watcher", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread:
+            self.thread.join(1)
+            self.thread = None
+
+    def _watch(self):
+        """Sample stacks only while some request is already over the threshold"""
+        interval = PROFILE_SAMPLE_INTERVAL_MS / 1000
+        threshold = SLOW_REQUEST_THRESHOLD_MS / 1000
+        me = threading.get_ident()
+        while not self.stopping.wait(interval):
+            now = time.monotonic()
+            slow = [record for record in list(self.inflight.values()) if now - record["start"] > threshold]
+            if slow:
+                stacks = current_stacks(me)
+                for record in slow:
+                    add_samples(record["stacks"], stacks)
+
+    def begin(self, method: str, path: str) -> dict:
+        record = {
+            "id": next(self.ids),
+            "method": method,
+            "path": path,
+            "started_at": datetime.utcnow(),
+            "start": time.monotonic(),
+            "status": None,
+            "sql": [],
+            "sql_dropped": 0,
+            "stacks": Counter(),
+        }
+        self.inflight[record["id"]] = record
+        return record
+
+    def end(self, record: dict):
+        self.inflight.pop(record["id"], None)
+        duration_ms = (time.monotonic() - record.pop("start")) * 1000
+        if duration_ms >= SLOW_REQUEST_THRESHOLD_MS:
+            record["duration_ms"] = round(duration_ms, 1)
+            self.captures.append(record)
+
+    def get(self, capture_id: int) -> Optional[dict]:
+        return next((capture for capture in self.captures if capture["id"] == capture_id), None)
+
+    def summaries(self) -> list:
+        """Newest first, without the bulky SQL log and stacks"""
+        return [
+            {
+                **{key: capture[key] for key in ("id", "method", "path", "status", "started_at", "duration_ms")},
+                "sql_count": len(capture["sql"]) + capture["sql_dropped"],
+                "samples": sum(list(capture["stacks"].values())),
+            }
+            for capture in reversed(self.captures)
+        ]
+
+
+slow_requests = SlowRequestMonitor()
+_current_request = contextvars.ContextVar("profiling_request", default=None)
+
+
+def install_sql_logging(engine):
+    """Record statements (not parameters) run on behalf of a watched request"""
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current_request.get() is not None:
+            conn.info.setdefault("profiling_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        record = _current_request.get()
+        if record is None or not conn.info.get("profiling_query_start"):
+            return
+        elapsed_ms = (time.perf_counter() - conn.info["profiling_query_start"].pop()) * 1000
+        if len(record["sql"]) < SLOW_REQUEST_MAX_SQL:
+            record["sql"].append({"statement": statement[:2000], "duration_ms": round(elapsed_ms, 2)})
+        else:
+            record["sql_dropped"] += 1
+
+
+class SlowRequestMiddleware:
+    """ASGI middleware that tracks in-flight requests for slow-request capture"""
+
+    def __init__(self, app, monitor: SlowRequestMonitor):
+        self.app = app
+        self.monitor = monitor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(UNWATCHED_PATH_PREFIXES):
+            return await self.app(scope, receive, send)
+
+        record = self.monitor.begin(scope["method"], scope["path"])
+        token = _current_request.set(record)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                record["status"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_request.reset(token)
+            self.monitor.end(record)
+
+
+async def profile_for(seconds: float) -> Counter:
+    """Run the sampler in its own thread so the event loop keeps serving (and being sampled)"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, sampler.run, seconds, PROFILE_SAMPLE_INTERVAL_MS / 1000)
@@ -0,0 +1,190 @@
+"""
+Admission control: per-client token buckets and a global concurrency limit.
+
+Every request is assigned a budget (login, upload or public) and keyed by
+the caller's IP, or by its bearer token once the token's signature checks
+out (so a forged header cannot buy a fresh bucket). Login attempts are
+always keyed by IP. Clients that run out of tokens get 429. Independently,
+at most MAX_CONCURRENT_REQUESTS run at once; a short queue absorbs bursts
+and anything beyond it is shed with 503 + Retry-After before latency
+collapses for everyone else.
+
+Bucket state is two floats per client, kept in a fixed-size LRU table,
+so memory stays bounded no matter how many addresses hit the server.
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import time
+from collections import OrderedDict, Counter
+from typing import Optional, Tuple
+
+from jose import JWTError, jwt
+
+from config import (
+    SECRET_KEY, ALGORITHM,
+    RATE_LIMIT_PUBLIC_PER_MINUTE, RATE_LIMIT_PUBLIC_BURST,
+    RATE_LIMIT_LOGIN_PER_MINUTE, RATE_LIMIT_LOGIN_BURST,
+    RATE_LIMIT_UPLOAD_PER_MINUTE, RATE_LIMIT_UPLOAD_BURST,
+    RATE_LIMIT_MAX_CLIENTS, RATE_LIMIT_TRUST_PROXY, RATE_LIMIT_TRUSTED_PROXY_HOPS,
+    MAX_CONCURRENT_REQUESTS, ADMISSION_QUEUE_SIZE, ADMISSION_WAIT_SECONDS,
+)
+
+# Long-lived streams would pin a concurrency slot for their whole lifetime
+UNLIMITED_CONCURRENCY_PATHS = ("/events",)
+
+
+class TokenBucketTable:
+    """Token buckets for many clients in a bounded LRU table"""
+
+    def __init__(self, per_minute: float, burst: int, max_clients: int = RATE_LIMIT_MAX_CLIENTS):
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.max_clients = max_clients
+        self.buckets: "OrderedDict[str, list]" = OrderedDict()  # key -> [tokens, last refill]
+
+    def take(self, key: str, now: Optional[float] = None) -> Tuple[bool, float]:
+        """Spend one token. Returns (allowed, seconds until a token is available)."""
+        now = time.monotonic() if now is None else now
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = [float(self.burst), now]
+            self.buckets[key] = bucket
+            if len(self.buckets) > self.max_clients:
+                # Forgetting the least recently seen client only ever makes it a fresh, full bucket
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return True, 0.0
+        return False, (1 - bucket[0]) / self.rate if self.rate else 60.0
+
+
+class AdmissionController:
+    def __init__(self):
+        self.budgets = {
+            "public": TokenBucketTable(RATE_LIMIT_PUBLIC_PER_MINUTE, RATE_LIMIT_PUBLIC_BURST),
+            "login": TokenBucketTable(RATE_LIMIT_LOGIN_PER_MINUTE, RATE_LIMIT_LOGIN_BURST),
+            "upload": TokenBucketTable(RATE_LIMIT_UPLOAD_PER_MINUTE, RATE_LIMIT_UPLOAD_BURST),
+        }
+        self.max_concurrent = MAX_CONCURRENT_REQUESTS
+        self.in_flight = 0
+        self.waiting = 0
+        self.slot_freed = asyncio.Condition()
+        self.rejected = Counter()
+        self.admitted = 0
+
+    @staticmethod
+    def budget_for(path: str) -> str:
+        if path == "/auth/login":
+            return "login"
+        if path.startswith("/upload") or path.startswith("/storage/"):
+            return "upload"
+        return "public"
+
+    @staticmethod
+    def client_key(scope, budget: str) -> str:
+        headers = dict(scope.get("headers") or [])
+        auth = headers.get(b"authorization", b"")
+        if budget != "login" and auth.lower().startswith(b"bearer "):
+            token = auth[7:].strip()
+            try:
+                jwt.decode(token.decode("latin-1"), SECRET_KEY, algorithms=[ALGORITHM])
+                return "t:" + hashlib.sha1(token).hexdigest()[:16]
+            except JWTError:
+                pass  # Unverified tokens share their IP's bucket
+        if RATE_LIMIT_TRUST_PROXY and b"x-forwarded-for" in headers:
+            # Clients can prepend anything; only the entries our own proxies appended are trustworthy
+            hops = [hop.strip() for hop in headers[b"x-forwarded-for"].split(b",")]
+            return "ip:" + hops[-min(max(RATE_LIMIT_TRUSTED_PROXY_HOPS, 1), len(hops))].decode("latin-1")
+        client = scope.get("client")
+        return "ip:" + (client[0] if client else "unknown")
+
+    async def acquire(self) -> bool:
+        if self.in_flight < self.max_concurrent:
+            self.in_flight += 1
+            return True
+        if self.waiting >= ADMISSION_QUEUE_SIZE:
+            return False
+        self.waiting += 1
+        try:
+            async with self.slot_freed:
+                await asyncio.wait_for(
+                    self.slot_freed.wait_for(lambda: self.in_flight < self.max_concurrent),
+                    timeout=ADMISSION_WAIT_SECONDS
+                )
+                self.in_flight += 1
+                return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.waiting -= 1
+
+    async def release(self):
+        self.in_flight -= 1
+        async with self.slot_freed:
+            self.slot_freed.notify()
+
+    def metrics(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_concurrent": self.max_concurrent,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "tracked_clients": {name: len(table.buckets) for name, table in self.budgets.items()},
+        }
+
+
+async def send_error(send, status_code: int, detail: str, retry_after: float):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionControlMiddleware:
+    """ASGI middleware (not BaseHTTPMiddleware, so streaming responses pass straight through)"""
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            return await self.app(scope, receive, send)
+
+        controller = self.controller
+        budget = controller.budget_for(scope["path"])
+        allowed, retry_after = controller.budgets[budget].take(controller.client_key(scope, budget))
+        if not allowed:
+            controller.rejected[f"rate_limited:{budget}"] += 1
+            return await send_error(send, 429, "Too many requests", retry_after)
+
+        if scope["path"] in UNLIMITED_CONCURRENCY_PATHS:
+            return await self.app(scope, receive, send)
+
+        if not await controller.acquire():
+            controller.rejected["overloaded"] += 1
+            return await send_error(send, 503, "Server is busy, please retry", ADMISSION_WAIT_SECONDS)
+        controller.admitted += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            await controller.release()
+
+
+admission = AdmissionController()
@@ -1,6 +1,8 @@
-from pydantic import BaseModel, HttpUrl
-from typing import Optional, List
-from datetime import datetime
+from pydantic import BaseModel, HttpUrl, Field
+from typing import Optional, List, Literal, Dict, Any
+from datetime import datetime, date
+
+from config import MAX_UPLOAD_BYTES, BATCH_MAX_OPERATIONS
 
 # Settings Schemas
 class SettingsBase(BaseModel):
@@ -48,6 +50,10 @@ class HeroUpdate(BaseModel):
 
 class Hero(HeroBase):
     id: int
+    profile_image_width: Optional[int] = None
+    profile_image_height: Optional[int] = None
+    profile_image_color: Optional[str] = None
+    profile_image_placeholder: Optional[str] = None
     created_at: datetime
     updated_at: datetime
     
@@ -91,6 +97,12 @@ class ProjectUpdate(BaseModel):
 
 class Project(ProjectBase):
     id: int
+    image_width: Optional[int] = None
+    image_height: Optional[int] = None
+    image_color: Optional[str] = None
+    image_placeholder: Optional[str] = None
+    position: Optional[str] = None
+    archived_at: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
 
@@ -119,12 +131,98 @@ class ExperienceUpdate(BaseModel):
 
 class Experience(ExperienceBase):
     id: int
+    position: Optional[str] = None
+    archived_at: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
 
     class Config:
         from_attributes = True
 
+# Ordering Schemas
+class MoveRequest(BaseModel):
+    after_id: Optional[int] = None  # Item that should come right before the moved one
+    before_id: Optional[int] = None  # Item that should come right after the moved one
+
+# Archive Schemas
+class ArchiveRequest(BaseModel):
+    ids: List[int]
+
+class ArchiveResult(BaseModel):
+    message: str
+    ids: List[int]
+
+class ProjectArchivePage(BaseModel):
+    items: List[Project]
+    total: int
+    page: int
+    page_size: int
+
+class ExperienceArchivePage(BaseModel):
+    items: List[Experience]
+    total: int
+    page: int
+    page_size: int
+
+# Job Schemas
+class Job(BaseModel):
+    id: int
+    kind: str
+    payload: Optional[Dict[str, Any]] = None
+    status: str
+    attempts: int
+    max_attempts: int
+    run_after: datetime
+    last_error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+# Analytics Schemas
+class AnalyticsEvent(BaseModel):
+    project_id: int
+    kind: Literal["view", "live_click", "github_click"]
+
+class AnalyticsBatch(BaseModel):
+    events: List[AnalyticsEvent] = Field(..., max_length=500)
+
+class ProjectStats(BaseModel):
+    project_id: int
+    title: Optional[str] = None
+    views: int
+    live_clicks: int
+    github_clicks: int
+
+class ProjectDailyStats(BaseModel):
+    day: date
+    views: int
+    live_clicks: int
+    github_clicks: int
+
+    class Config:
+        from_attributes = True
+
+# Backup Schemas
+class Backup(BaseModel):
+    name: str
+    size: int
+    created_at: datetime
+
+# Upload Schemas
+class PresignRequest(BaseModel):
+    filename: str
+    content_type: str
+    size: int = Field(..., ge=1, le=MAX_UPLOAD_BYTES)  # signed into the upload URL
+
+class PresignResponse(BaseModel):
+    key: str
+    upload_url: str
+    method: str
+    headers: Dict[str, str]
+    file_url: str
+
 # Auth Schemas
 class UserLogin(BaseModel):
     username: str
@@ -140,4 +238,25 @@ class PortfolioData(BaseModel):
     featured_projects: List[Project] = []
     projects: List[Project] = []
     experiences: List[Experience] = []
-    settings: Optional[Settings] = None
\ No newline at end of file
+    settings: Optional[Settings] = None
+
+# Batch Schemas
+class BatchOperation(BaseModel):
+    op: Literal["create", "update", "delete", "toggle_featured"]
+    entity: Literal["project", "experience", "hero", "settings"]
+    id: Optional[int] = None
+    data: Optional[Dict[str, Any]] = None
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation] = Field(..., max_length=BATCH_MAX_OPERATIONS)
+
+class BatchOperationResult(BaseModel):
+    index: int
+    op: str
+    entity: str
+    id: Optional[int] = None
+    status: str = "ok"
+    error: Optional[str] = None
+
+class BatchResponse(BaseModel):
+    results: List[BatchOperationResult]
@@ -0,0 +1,159 @@
+"""
+Storage backends for uploaded images.
+
+STORAGE_BACKEND=local keeps files in UPLOAD_DIR and serves them from the
+/uploads mount. STORAGE_BACKEND=s3 stores them in an S3-compatible bucket
+(AWS, MinIO, ...). Either way the browser uploads straight to a presigned
+PUT URL, so image bytes never pass through the API workers when S3 is
+used; the local backend's "presigned" URL is an HMAC-signed API route.
+Presigned URLs are bound to the declared size, so MAX_UPLOAD_BYTES holds
+for direct uploads too.
+"""
+
+import hashlib
+import hmac
+import time
+from typing import Iterator, Optional, Tuple
+from urllib.parse import urlencode
+
+from config import (
+    STORAGE_BACKEND, UPLOAD_DIR, SECRET_KEY, PRESIGNED_URL_EXPIRE_SECONDS,
+    S3_BUCKET, S3_ENDPOINT_URL, S3_REGION, S3_ACCESS_KEY_ID, S3_SECRET_ACCESS_KEY, S3_PUBLIC_URL,
+)
+
+
+def valid_key(key: str) -> bool:
+    """Keys are relative, forward-slash paths without any parent references"""
+    return bool(key) and not key.startswith(("/", "\\")) and "\\" not in key and ".." not in key.split("/")
+
+
+class LocalStorage:
+    def __init__(self, directory=UPLOAD_DIR):
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.root = self.directory.resolve()
+
+    def _path(self, key: str):
+        """Path of `key` inside the upload directory; anything that would escape it does not exist"""
+        if not valid_key(key):
+            raise FileNotFoundError(key)
+        path = (self.directory / key).resolve()
+        if not path.is_relative_to(self.root):
+            raise FileNotFoundError(key)
+        return path
+
+    def save(self, key: str, data: bytes, content_type: str):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+    def read(self, key: str) -> bytes:
+        path = self._path(key)
+        if not path.is_file():
+            raise FileNotFoundError(key)
+        return path.read_bytes()
+
+    def exists(self, key: str) -> bool:
+        try:
+            return self._path(key).is_file()
+        except FileNotFoundError:
+            return False
+
+    def delete(self, key: str):
+        self._path(key).unlink(missing_ok=True)
+
+    def list(self) -> Iterator[Tuple[str, float]]:
+        """(key, last modified unix time) for every stored object"""
+        for path in self.directory.rglob("*"):
+            if path.is_file():
+                yield path.relative_to(self.directory).as_posix(), path.stat().st_mtime
+
+    def url_for(self, key: str) -> str:
+        return f"/uploads/{key}"
+
+    @staticmethod
+    def signature(key: str, content_type: str, size: int, expires: int) -> str:
+        message = f"{key}|{content_type}|{size}|{expires}".encode()
+        return hmac.new(SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+    def verify_signature(self, key: str, content_type: str, size: int, expires: int, signature: str) -> bool:
+        return expires >= time.time() and hmac.compare_digest(self.signature(key, content_type, size, expires), signature)
+
+    def presign_put(self, key: str, content_type: str, size: int) -> str:
+        expires = int(time.time()) + PRESIGNED_URL_EXPIRE_SECONDS
+        query = urlencode({"size": size, "expires": expires, "signature": self.signature(key, content_type, size, expires)})
+        # Relative to the API, like the /uploads URLs this backend hands out
+        return f"/storage/{key}?{query}"
+
+
+class S3Storage:
+    def __init__(self):
+        import boto3  # Only required when STORAGE_BACKEND=s3
+        from botocore.config import Config
+
+        self.bucket = S3_BUCKET
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=S3_ENDPOINT_URL or None,
+            region_name=S3_REGION or None,
+            aws_access_key_id=S3_ACCESS_KEY_ID or None,
+            aws_secret_access_key=S3_SECRET_ACCESS_KEY or None,
+            # SigV4 signs Content-Length into presigned PUTs (SigV2 URLs would accept any size)
+            config=Config(signature_version="s3v4"),
+        )
+        self.client_errors = self.client.exceptions.ClientError
+
+    def save(self, key: str, data: bytes, content_type: str):
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=data, ContentType=content_type)
+
+    def read(self, key: str) -> bytes:
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+        except self.client.exceptions.NoSuchKey:
+            raise FileNotFoundError(key)
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except self.client_errors:
+            return False
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def list(self) -> Iterator[Tuple[str, float]]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket):
+            for obj in page.get("Contents", []):
+                yield obj["Key"], obj["LastModified"].timestamp()
+
+    def url_for(self, key: str) -> str:
+        if S3_PUBLIC_URL:
+            return f"{S3_PUBLIC_URL.rstrip('/')}/{key}"
+        if S3_ENDPOINT_URL:
+            return f"{S3_ENDPOINT_URL.rstrip('/')}/{self.bucket}/{key}"
+        return f"https://{self.bucket}.s3.amazonaws.com/{key}"
+
+    def presign_put(self, key: str, content_type: str, size: int) -> str:
+        return self.client.generate_presigned_url(
+            "put_object",
+            Params={"Bucket": self.bucket, "Key": key, "ContentType": content_type, "ContentLength": size},
+            ExpiresIn=PRESIGNED_URL_EXPIRE_SECONDS,
+        )
+
+
+def key_from_url(url: Optional[str]) -> Optional[str]:
+    """The storage key an image URL points at, or None for external images"""
+    if not url:
+        return None
+    url = url.split("?", 1)[0]
+    if "/uploads/" in url:
+        return url.split("/uploads/", 1)[1]
+    base = storage.url_for("")
+    if base.startswith("http") and url.startswith(base):
+        return url[len(base):]
+    return None
+
+
+storage = S3Storage() if STORAGE_BACKEND == "s3" else LocalStorage()
@@ -0,0 +1,47 @@
+"""
+Background job handlers. Importing this module registers them with jobs.py.
+"""
+
+import time
+
+from sqlalchemy.orm import Session
+
+from backup import create_backup
+from config import ORPHAN_UPLOAD_GRACE_SECONDS
+from images import update_placeholder
+from jobs import job_handler
+from models import Hero, Project
+from storage import storage, key_from_url
+
+
+def referenced_upload_keys(db: Session) -> set:
+    """Storage keys that are still used by a hero or project image"""
+    keys = set()
+    for column in (Hero.profile_image, Project.image):
+        for (url,) in db.query(column).filter(column.isnot(None)).all():
+            keys.add(key_from_url(url))
+    return keys
+
+
+@job_handler("cleanup_orphaned_uploads")
+def cleanup_orphaned_uploads(db: Session, payload: dict):
+    """Delete uploaded files no longer referenced by any row"""
+    referenced = referenced_upload_keys(db)
+    # Leave fresh files alone: they may belong to a form that hasn't been saved yet
+    cutoff = time.time() - ORPHAN_UPLOAD_GRACE_SECONDS
+    for key, modified in list(storage.list()):
+        if key not in referenced and modified < cutoff:
+            storage.delete(key)
+
+
+@job_handler("compute_image_placeholder")
+def compute_image_placeholder(db: Session, payload: dict):
+    """Size, dominant colour and LQIP for a hero or project image"""
+    update_placeholder(db, payload["entity"], payload["id"])
+    db.commit()
+
+
+@job_handler("create_backup")
+def create_backup_job(db: Session, payload: dict):
+    """Online snapshot of the database (see backup.py)"""
+    create_backup()
@@ -0,0 +1,236 @@
+"""
+Multi-tenant mode: many portfolios served from one process and one database.
+
+With MULTI_TENANT enabled, TenantMiddleware resolves each request to a
+tenant, first from a /t/{slug}/... path prefix (which it strips), then from
+the Host header, and otherwise falls back to the default tenant. The
+tenant id is put in the request state and in `current_tenant`.
+
+Sessions opened with a tenant id in `session.info` only see that tenant's
+rows: every ORM SELECT/UPDATE/DELETE on a tenant-owned model gets a
+`tenant_id = ?` criterion, and new rows are stamped with it on flush. This
+means endpoint queries such as `db.query(Hero).first()` stay unchanged.
+Request sessions in single-tenant mode are scoped to the default tenant,
+which keeps their queries on the tenant-leading indexes. Sessions without
+a tenant (background jobs, analytics flushes) see everything.
+
+    python tenancy.py create <slug> --host jane.example.com --username jane --password ...
+    python tenancy.py list
+    python tenancy.py set-password <slug> --password ...
+"""
+
+import argparse
+import contextvars
+import sys
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from passlib.context import CryptContext
+from sqlalchemy import event
+from sqlalchemy.orm import with_loader_criteria
+from starlette.concurrency import run_in_threadpool
+
+from config import TENANT_PATH_PREFIX, TENANT_LOOKUP_CACHE_SIZE, TENANT_LOOKUP_TTL_SECONDS
+from db import SessionLocal
+from models import Tenant, Hero, Project, Experience, Settings, DEFAULT_TENANT_ID
+
+# Models whose rows belong to exactly one tenant
+TENANT_MODELS = (Hero, Project, Experience, Settings)
+
+# Tenant of the request being handled (None outside requests or in single-tenant mode)
+current_tenant = contextvars.ContextVar("current_tenant", default=None)
+
+# Pure-Python scheme, so tenant logins do not depend on the native bcrypt build
+tenant_pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+
+
+def scope_sessions_to_tenant(session_factory):
+    """Restrict sessions that carry info["tenant_id"] to that tenant's rows"""
+    @event.listens_for(session_factory, "do_orm_execute")
+    def add_tenant_criteria(execute_state):
+        tenant_id = execute_state.session.info.get("tenant_id")
+        if tenant_id is None or execute_state.is_column_load or execute_state.is_relationship_load:
+            return
+        execute_state.statement = execute_state.statement.options(*(
+            with_loader_criteria(model, lambda cls: cls.tenant_id == tenant_id, include_aliases=True)
+            for model in TENANT_MODELS
+        ))
+
+    @event.listens_for(session_factory, "before_flush")
+    def stamp_new_rows(session, flush_context, instances):
+        tenant_id = session.info.get("tenant_id")
+        if tenant_id is None:
+            return
+        for obj in session.new:
+            if isinstance(obj, TENANT_MODELS):
+                obj.tenant_id = tenant_id
+
+
+def tenant_session(tenant_id: Optional[int]):
+    """A session scoped to `tenant_id` (the default tenant when None, i.e. in single-tenant mode)"""
+    return SessionLocal(info={"tenant_id": tenant_id or DEFAULT_TENANT_ID})
+
+
+def request_tenant(request) -> Optional[int]:
+    """Tenant id TenantMiddleware assigned to this request, None in single-tenant mode"""
+    return request.scope.get("state", {}).get("tenant_id")
+
+
+class TenantDirectory:
+    """Host / slug -> tenant id lookups, cached in a bounded LRU with a TTL"""
+
+    def __init__(self, max_entries: int = TENANT_LOOKUP_CACHE_SIZE, ttl: float = TENANT_LOOKUP_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries: "OrderedDict[tuple, tuple]" = OrderedDict()  # (field, value) -> (tenant id or None, expires)
+
+    @staticmethod
+    def _load(field: str, value: str) -> Optional[int]:
+        db = SessionLocal()
+        try:
+            row = db.query(Tenant.id).filter(getattr(Tenant, field) == value).first()
+            return row[0] if row else None
+        finally:
+            db.close()
+
+    async def lookup(self, field: str, value: str) -> Optional[int]:
+        key = (field, value)
+        entry = self.entries.get(key)
+        now = time.monotonic()
+        if entry is not None and entry[1] > now:
+            self.entries.move_to_end(key)
+            return entry[0]
+        # Unknown hosts are cached too, so a flood of junk Host headers costs one query each per TTL
+        tenant_id = await run_in_threadpool(self._load, field, value)
+        self.entries[key] = (tenant_id, now + self.ttl)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return tenant_id
+
+    def clear(self):
+        self.entries.clear()
+
+
+async def send_not_found(send):
+    body = b'{"detail":"Portfolio not found"}'
+    await send({
+        "type": "http.response.start",
+        "status": 404,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class TenantMiddleware:
+    """ASGI middleware that assigns every request to a tenant"""
+
+    def __init__(self, app, directory: TenantDirectory):
+        self.app = app
+        self.directory = directory
+        self.prefix = TENANT_PATH_PREFIX.rstrip("/") + "/"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        path = scope["path"]
+        if path.startswith(self.prefix):
+            slug, _, rest = path[len(self.prefix):].partition("/")
+            tenant_id = await self.directory.lookup("slug", slug)
+            if tenant_id is None:
+                return await send_not_found(send)
+            scope = dict(scope)
+            scope["root_path"] = scope.get("root_path", "") + self.prefix + slug
+            scope["path"] = "/" + rest
+            scope["raw_path"] = scope["path"].encode()
+        else:
+            host = dict(scope.get("headers") or []).get(b"host", b"").decode("latin-1")
+            host = host.rsplit(":", 1)[0].lower() if host and not host.endswith("]") else host.lower()
+            tenant_id = (await self.directory.lookup("host", host) if host else None) or DEFAULT_TENANT_ID
+
+        scope.setdefault("state", {})["tenant_id"] = tenant_id
+        token = current_tenant.set(tenant_id)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_tenant.reset(token)
+
+
+def ensure_default_tenant():
+    db = SessionLocal()
+    try:
+        if db.get(Tenant, DEFAULT_TENANT_ID) is None:
+            db.add(Tenant(id=DEFAULT_TENANT_ID, slug="default", name="Default portfolio"))
+            db.commit()
+    finally:
+        db.close()
+
+
+def verify_tenant_admin(tenant_id: int, username: str, password: str) -> bool:
+    """Check a non-default tenant's admin credentials"""
+    db = SessionLocal()
+    try:
+        tenant = db.get(Tenant, tenant_id)
+        if tenant is None or not tenant.admin_password_hash or tenant.admin_username != username:
+            return False
+        return tenant_pwd_context.verify(password, tenant.admin_password_hash)
+    finally:
+        db.close()
+
+
+tenant_directory = TenantDirectory()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage portfolio tenants")
+    commands = parser.add_subparsers(dest="command", required=True)
+    create = commands.add_parser("create", help="add a tenant")
+    create.add_argument("slug")
+    create.add_argument("--host")
+    create.add_argument("--name")
+    create.add_argument("--username", required=True)
+    create.add_argument("--password", required=True)
+    commands.add_parser("list", help="show tenants")
+    password = commands.add_parser("set-password", help="change a tenant admin's password")
+    password.add_argument("slug")
+    password.add_argument("--password", required=True)
+    args = parser.parse_args(argv)
+
+    from models import Base
+    from db import engine
+    Base.metadata.create_all(bind=engine)
+    ensure_default_tenant()
+
+    db = SessionLocal()
+    try:
+        if args.command == "create":
+            tenant = Tenant(
+                slug=args.slug,
+                host=args.host.lower() if args.host else None,
+                name=args.name,
+                admin_username=args.username,
+                admin_password_hash=tenant_pwd_context.hash(args.password),
+            )
+            db.add(tenant)
+            db.commit()
+            print(f"Created tenant {tenant.id} ({tenant.slug})")
+        elif args.command == "list":
+            for tenant in db.query(Tenant).order_by(Tenant.id).all():
+                print(f"{tenant.id}\t{tenant.slug}\t{tenant.host or '-'}\t{tenant.admin_username or '-'}")
+        elif args.command == "set-password":
+            tenant = db.query(Tenant).filter(Tenant.slug == args.slug).first()
+            if tenant is None or tenant.id == DEFAULT_TENANT_ID:
+                print("Unknown tenant (the default tenant uses ADMIN_USERNAME / ADMIN_PASSWORD)")
+                return 1
+            tenant.admin_password_hash = tenant_pwd_context.hash(args.password)
+            db.commit()
+            print(f"Password updated for {tenant.slug}")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
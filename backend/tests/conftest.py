@@ -0,0 +1,29 @@
+"""
+Test settings. config.py reads the environment at import time, so everything
+here runs before any test imports the app. Each run gets a throwaway
+database and storage directories; portfolio.db is never touched.
+"""
+
+import os
+import sys
+import tempfile
+
+WORKDIR = tempfile.mkdtemp(prefix="portfolio-tests-")
+
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{WORKDIR}/test.db",
+    "UPLOAD_DIR": f"{WORKDIR}/uploads",
+    "IMAGE_CACHE_DIR": f"{WORKDIR}/image_cache",
+    "BACKUP_DIR": f"{WORKDIR}/backups",
+    "STORAGE_BACKEND": "local",
+    "MULTI_TENANT": "false",
+    "PROFILING_ENABLED": "false",
+    # Bursts come from one in-process "client"; measure the app, not the limiter
+    "RATE_LIMIT_PUBLIC_PER_MINUTE": "100000000",
+    "RATE_LIMIT_PUBLIC_BURST": "100000000",
+    "RATE_LIMIT_UPLOAD_PER_MINUTE": "100000000",
+    "RATE_LIMIT_UPLOAD_BURST": "100000000",
+    "ADMISSION_QUEUE_SIZE": "10000",
+})
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,54 @@
+"""
+POST /batch: bad operations come back as per-operation 400s, never as 500s,
+and created rows behave like ones made through the single-item routes.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from config import ADMIN_USERNAME, ADMIN_PASSWORD, BATCH_MAX_OPERATIONS
+from ratelimit import admission
+
+
+@pytest.fixture
+def client():
+    for table in admission.budgets.values():
+        table.buckets.clear()
+    test_client = TestClient(main.app)
+    token = test_client.post("/auth/login", json={"username": ADMIN_USERNAME, "password": ADMIN_PASSWORD}).json()
+    test_client.headers["Authorization"] = f"Bearer {token['access_token']}"
+    return test_client
+
+
+def batch(client, *operations):
+    return client.post("/batch", json={"operations": list(operations)})
+
+
+def test_null_for_not_null_column_is_a_validation_error(client):
+    created = batch(client, {"op": "create", "entity": "project", "data": {"title": "t", "description": "d"}})
+    assert created.status_code == 200
+    project_id = created.json()["results"][0]["id"]
+
+    response = batch(client, {"op": "update", "entity": "project", "id": project_id, "data": {"title": None}})
+    assert response.status_code == 400
+    result, = response.json()["detail"]
+    assert result["status"] == "error" and result["error"] == "title: may not be null"
+
+    # Nullable columns can still be cleared
+    cleared = batch(client, {"op": "update", "entity": "project", "id": project_id, "data": {"github_url": None}})
+    assert cleared.status_code == 200
+
+
+def test_operation_count_is_bounded(client):
+    operation = {"op": "toggle_featured", "entity": "project", "id": 1}
+    assert batch(client, *[operation] * (BATCH_MAX_OPERATIONS + 1)).status_code == 422
+
+
+def test_events_for_batch_created_projects_are_accepted(client):
+    created = batch(client, *[
+        {"op": "create", "entity": "project", "data": {"title": f"batch {i}", "description": "d"}} for i in range(2)
+    ])
+    assert created.status_code == 200
+    events = [{"project_id": result["id"], "kind": "view"} for result in created.json()["results"]]
+    assert client.post("/analytics/events", json={"events": events}).json() == {"accepted": 2}
@@ -0,0 +1,37 @@
+"""
+/img variants: requested sizes snap to IMAGE_VARIANT_SIZES, so nearby sizes
+share one cached file, and transforms run in spawned worker processes.
+"""
+
+import io
+
+from fastapi.testclient import TestClient
+from PIL import Image
+
+import main
+from config import IMAGE_VARIANT_SIZES
+from imagecache import snap_size
+from storage import storage
+
+
+def test_snap_size_rounds_up_to_an_allowed_size():
+    assert snap_size(None) is None
+    assert snap_size(1) == IMAGE_VARIANT_SIZES[0]
+    assert snap_size(IMAGE_VARIANT_SIZES[1]) == IMAGE_VARIANT_SIZES[1]
+    assert snap_size(IMAGE_VARIANT_SIZES[1] + 1) == IMAGE_VARIANT_SIZES[2]
+    assert snap_size(IMAGE_VARIANT_SIZES[-1] + 1) == IMAGE_VARIANT_SIZES[-1]
+
+
+def test_nearby_sizes_share_one_variant():
+    buffer = io.BytesIO()
+    Image.new("RGB", (900, 600), "blue").save(buffer, "PNG")
+    storage.save("variants/source.png", buffer.getvalue(), "image/png")
+
+    with TestClient(main.app) as client:
+        before = len(main.image_variants.cache.entries)
+        for width in (301, 310, 320):
+            response = client.get("/img/variants/source.png", params={"w": width, "fmt": "jpg"})
+            assert response.status_code == 200
+            assert Image.open(io.BytesIO(response.content)).width == 320
+        assert client.get("/img/variants/source.png", params={"w": 320, "fmt": "jpeg"}).status_code == 200
+        assert len(main.image_variants.cache.entries) == before + 1
@@ -0,0 +1,37 @@
+"""
+Fractional position keys: appends stay short and every gap stays splittable.
+"""
+
+import random
+
+from ordering import key_between, evenly_spaced_keys
+
+
+def append(count: int, start=None) -> list:
+    keys, key = [], start
+    for _ in range(count):
+        key = key_between(key, None)
+        keys.append(key)
+    return keys
+
+
+def test_appends_grow_logarithmically():
+    keys = append(20000)
+    assert keys == sorted(keys) and len(set(keys)) == len(keys)
+    assert max(map(len, keys[:2000])) <= 4
+    assert max(map(len, keys)) <= 8
+
+
+def test_appends_after_rebalanced_keys():
+    keys = evenly_spaced_keys(500)
+    keys += append(5000, keys[-1])
+    assert keys == sorted(keys) and len(set(keys)) == len(keys)
+    assert max(map(len, keys)) <= 8
+
+
+def test_every_gap_can_be_split():
+    keys = append(3000)
+    for _ in range(500):
+        i = random.randrange(len(keys) - 1)
+        assert keys[i] < key_between(keys[i], keys[i + 1]) < keys[i + 1]
+    assert key_between(None, keys[0]) < keys[0]
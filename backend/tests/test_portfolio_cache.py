@@ -0,0 +1,120 @@
+"""
+Load test for the GET / snapshot cache: however many requests arrive after
+an admin edit, the database sees a single rebuild's worth of queries.
+"""
+
+import asyncio
+from contextlib import contextmanager
+
+import httpx
+import pytest
+from sqlalchemy import event, update
+
+import main
+from cache import portfolio_cache
+from db import engine, SessionLocal
+from models import Hero, Project, Settings, DEFAULT_TENANT_ID
+from ordering import next_position
+
+BURST = 300
+
+# One loop for the whole module, like a server process: the app's asyncio primitives bind to the first loop they see
+loop = asyncio.new_event_loop()
+
+
+@contextmanager
+def count_statements():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def add_project(title: str):
+    db = SessionLocal(info={"tenant_id": DEFAULT_TENANT_ID})
+    try:
+        db.add(Project(title=title, description="Load test", technologies=[], position=next_position(db, Project)))
+        db.commit()
+    finally:
+        db.close()
+
+
+@pytest.fixture(scope="module", autouse=True)
+def portfolio():
+    db = SessionLocal(info={"tenant_id": DEFAULT_TENANT_ID})
+    try:
+        db.add(Hero(name="Test", title="Engineer", description="Hero"))
+        db.add(Settings(font_size="medium", theme="light"))
+        db.commit()
+    finally:
+        db.close()
+    add_project("first")
+
+
+async def burst(params=None, headers=None, size=BURST) -> list:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+        responses = await asyncio.gather(*(client.get("/", params=params, headers=headers) for _ in range(size)))
+        # Let a background refresh started by the burst finish before counting
+        while portfolio_cache.inflight:
+            await asyncio.sleep(0.01)
+    assert {response.status_code for response in responses} == {200}
+    return [response.json() for response in responses]
+
+
+def one_rebuild() -> int:
+    with count_statements() as statements:
+        main.build_portfolio_payload()
+    return len(statements)
+
+
+def test_burst_after_edit_costs_one_rebuild():
+    loop.run_until_complete(burst())  # warm
+    add_project("second")
+
+    with count_statements() as statements:
+        loop.run_until_complete(burst())
+    assert len(statements) == one_rebuild()
+
+    with count_statements() as statements:
+        loop.run_until_complete(burst())
+    assert statements == []
+
+
+def test_refetch_after_notification_never_sees_older_snapshot():
+    loop.run_until_complete(burst())
+    add_project("third")
+    # What an SSE change notification for that commit carries
+    version = portfolio_cache.version_token()
+
+    with count_statements() as statements:
+        payloads = loop.run_until_complete(burst({"min_version": version}))
+    assert all("third" in [project["title"] for project in payload["projects"]] for payload in payloads)
+    assert len(statements) == one_rebuild()
+
+
+def test_admin_reads_its_own_writes():
+    loop.run_until_complete(burst())
+    add_project("fourth")
+    # The dashboard reloads GET / with its token right after saving, without any notification
+    payload, = loop.run_until_complete(burst(headers={"Authorization": "Bearer dashboard"}, size=1))
+    assert "fourth" in [project["title"] for project in payload["projects"]]
+
+
+def test_writes_from_other_processes_show_up_after_max_age(monkeypatch):
+    loop.run_until_complete(burst(size=1))
+    # Like backup.py restore or a second worker: no session events, so no version bump here
+    with engine.begin() as connection:
+        connection.execute(update(Project.__table__).where(Project.title == "first").values(title="restored"))
+    payload, = loop.run_until_complete(burst(size=1))
+    assert "restored" not in [project["title"] for project in payload["projects"]]
+
+    monkeypatch.setattr(portfolio_cache, "max_age_seconds", 0)
+    loop.run_until_complete(burst(size=1))  # served once more, refresh starts
+    payload, = loop.run_until_complete(burst(size=1))
+    assert "restored" in [project["title"] for project in payload["projects"]]
@@ -0,0 +1,39 @@
+"""
+Rate limiter keys: what a client can and cannot do to get itself a fresh bucket.
+"""
+
+import ratelimit
+from ratelimit import AdmissionController, TokenBucketTable
+
+
+def scope(*headers, client="203.0.113.7"):
+    return {"headers": [(name.encode(), value.encode()) for name, value in headers], "client": (client, 1234)}
+
+
+def test_forwarded_for_uses_the_entry_our_proxy_appended(monkeypatch):
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_TRUST_PROXY", True)
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_TRUSTED_PROXY_HOPS", 1)
+    keys = {
+        AdmissionController.client_key(scope(("x-forwarded-for", f"10.0.0.{n}, 198.51.100.9"), client="127.0.0.1"), "login")
+        for n in range(20)
+    }
+    assert keys == {"ip:198.51.100.9"}
+
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_TRUSTED_PROXY_HOPS", 2)
+    key = AdmissionController.client_key(scope(("x-forwarded-for", "1.1.1.1, 198.51.100.9, 10.0.0.2")), "login")
+    assert key == "ip:198.51.100.9"
+
+
+def test_forged_bearer_tokens_share_the_ip_bucket():
+    keys = {AdmissionController.client_key(scope(("authorization", f"Bearer forged{n}")), "public") for n in range(20)}
+    assert keys == {"ip:203.0.113.7"}
+
+
+def test_spoofed_login_attempts_are_limited(monkeypatch):
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_TRUST_PROXY", True)
+    table = TokenBucketTable(per_minute=5, burst=5)
+    allowed = [
+        table.take(AdmissionController.client_key(scope(("x-forwarded-for", f"10.0.0.{n}, 198.51.100.9")), "login"), now=0)[0]
+        for n in range(20)
+    ]
+    assert allowed.count(True) == 5
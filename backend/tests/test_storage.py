@@ -0,0 +1,110 @@
+"""
+Storage backends: the S3 backend against moto standing in for S3/MinIO,
+plus the API's presign and direct-upload routes.
+"""
+
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+import main
+import storage as storage_module
+from config import MAX_UPLOAD_BYTES, ADMIN_USERNAME, ADMIN_PASSWORD
+from ratelimit import admission
+from storage import LocalStorage, key_from_url
+
+moto = pytest.importorskip("moto")
+requests = pytest.importorskip("requests")
+
+BUCKET = "portfolio"
+
+
+def png_bytes() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (40, 30), "red").save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setattr(storage_module, "S3_BUCKET", BUCKET)
+    monkeypatch.setattr(storage_module, "S3_REGION", "us-east-1")
+    monkeypatch.setattr(storage_module, "S3_ENDPOINT_URL", "")
+    monkeypatch.setattr(storage_module, "S3_PUBLIC_URL", "")
+    with moto.mock_aws():
+        backend = storage_module.S3Storage()
+        backend.client.create_bucket(Bucket=BUCKET)
+        # Everything that captured the configured backend at import time
+        monkeypatch.setattr(storage_module, "storage", backend)
+        monkeypatch.setattr(main, "storage", backend)
+        yield backend
+
+
+@pytest.fixture
+def client():
+    for table in admission.budgets.values():
+        table.buckets.clear()
+    test_client = TestClient(main.app)
+    token = test_client.post("/auth/login", json={"username": ADMIN_USERNAME, "password": ADMIN_PASSWORD}).json()
+    test_client.headers["Authorization"] = f"Bearer {token['access_token']}"
+    return test_client
+
+
+def presign(client, size, content_type="image/png"):
+    return client.post("/upload/presign", json={"filename": "a.png", "content_type": content_type, "size": size})
+
+
+def test_s3_save_read_list_delete(s3):
+    data = png_bytes()
+    s3.save("a/b.png", data, "image/png")
+    assert s3.exists("a/b.png")
+    assert s3.read("a/b.png") == data
+    assert [key for key, _ in s3.list()] == ["a/b.png"]
+    s3.delete("a/b.png")
+    assert not s3.exists("a/b.png")
+    with pytest.raises(FileNotFoundError):
+        s3.read("a/b.png")
+
+
+def test_s3_presigned_put_round_trip(s3, client):
+    data = png_bytes()
+    response = presign(client, len(data))
+    assert response.status_code == 200
+    upload = response.json()
+    assert upload["upload_url"].startswith("https://")
+    # The declared size is part of the signature
+    assert "content-length" in upload["upload_url"].split("X-Amz-SignedHeaders=", 1)[1].split("&", 1)[0]
+
+    assert requests.put(upload["upload_url"], data=data, headers=upload["headers"]).status_code == 200
+    assert s3.read(upload["key"]) == data
+    assert key_from_url(upload["file_url"]) == upload["key"]
+
+
+def test_presign_requires_a_size_within_the_limit(client):
+    assert presign(client, None).status_code == 422
+    assert presign(client, MAX_UPLOAD_BYTES + 1).status_code == 422
+    assert presign(client, 10, content_type="text/plain").status_code == 400
+
+
+def test_local_presigned_put_must_match_signed_size(client):
+    assert isinstance(main.storage, LocalStorage)
+    data = png_bytes()
+    upload = presign(client, len(data)).json()
+    assert client.put(upload["upload_url"], content=data + b"x", headers=upload["headers"]).status_code == 400
+    assert client.put(upload["upload_url"], content=data[:-1], headers=upload["headers"]).status_code == 400
+    tampered = upload["upload_url"].replace(f"size={len(data)}", f"size={len(data) + 1}")
+    assert client.put(tampered, content=data + b"x", headers=upload["headers"]).status_code == 403
+    assert client.put(upload["upload_url"], content=data, headers=upload["headers"]).status_code == 201
+    assert main.storage.read(upload["key"]) == data
+
+
+def test_local_keys_cannot_escape_the_upload_directory():
+    local = LocalStorage()
+    for key in ("/etc/passwd", "../secret", "a/../../secret", "\\etc\\passwd", ""):
+        assert not local.exists(key)
+        with pytest.raises(FileNotFoundError):
+            local.read(key)
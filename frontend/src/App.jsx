@@ -14,7 +14,7 @@ import Experiences from "./components/Experiences";
 import Footer from "./components/Footer";
 import AdminLogin from "./components/AdminLogin";
 import AdminDashboard from "./components/AdminDashboard";
-import { portfolioAPI } from "./services/api";
+import { portfolioAPI, eventsAPI } from "./services/api";
 import "./App.css";
 
 function App() {
@@ -77,9 +77,9 @@ function App() {
     }
   }, [portfolioData.settings]);
 
-  const fetchPortfolioData = async () => {
+  const fetchPortfolioData = async (minVersion) => {
     try {
-      const data = await portfolioAPI.getAll();
+      const data = await portfolioAPI.getAll(minVersion);
       setPortfolioData({
         hero: data.hero || portfolioData.hero,
         featured_projects: data.featured_projects || [],
@@ -98,6 +98,21 @@ function App() {
   }, []);
   // Fetch portfolio data on component mount
 
+  // Refetch when the backend pushes a change notification, coalescing bursts
+  useEffect(() => {
+    let timer = null;
+    let latestVersion = null;
+    const unsubscribe = eventsAPI.subscribe((change) => {
+      if (change && change.version) latestVersion = change.version;
+      clearTimeout(timer);
+      timer = setTimeout(() => fetchPortfolioData(latestVersion), 250);
+    });
+    return () => {
+      clearTimeout(timer);
+      unsubscribe();
+    };
+  }, []);
+
   const handleAdminLogin = (success, token) => {
     if (success && token) {
       setIsAdmin(true);
@@ -1,5 +1,7 @@
 import React from "react";
 import { Github, ExternalLink } from "lucide-react";
+import { placeholderStyle } from "../utils/placeholder";
+import { analyticsAPI } from "../services/api";
 
 const FeaturedWork = ({ projects }) => {
   if (!projects || projects.length === 0) {
@@ -36,6 +38,13 @@ const FeaturedWork = ({ projects }) => {
                   <img
                     src={project.image}
                     alt={project.title}
+                    width={project.image_width || undefined}
+                    height={project.image_height || undefined}
+                    decoding="async"
+                    style={placeholderStyle(
+                      project.image_color,
+                      project.image_placeholder
+                    )}
                     className="w-full h-full object-cover"
                   />
                 ) : (
@@ -72,9 +81,10 @@ const FeaturedWork = ({ projects }) => {
 
                 {/* Action Buttons */}
                 <div className="flex gap-3">
-                  {project.githubUrl && (
+                  {project.github_url && (
                     <a
-                      href={project.githubUrl}
+                      href={project.github_url}
+                      onClick={() => analyticsAPI.track(project.id, "github_click")}
                       target="_blank"
                       rel="noopener noreferrer"
                       className="flex items-center gap-2 text-teal-400 hover:text-teal-300 text-xs sm:text-sm transition-colors"
@@ -83,9 +93,10 @@ const FeaturedWork = ({ projects }) => {
                       Code
                     </a>
                   )}
-                  {project.liveUrl && (
+                  {project.live_url && (
                     <a
-                      href={project.liveUrl}
+                      href={project.live_url}
+                      onClick={() => analyticsAPI.track(project.id, "live_click")}
                       target="_blank"
                       rel="noopener noreferrer"
                       className="flex items-center gap-2 text-teal-400 hover:text-teal-300 text-xs sm:text-sm transition-colors"
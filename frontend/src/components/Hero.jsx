@@ -1,5 +1,6 @@
 import React from "react";
 import { User, ArrowDown, Sparkles } from "lucide-react";
+import { placeholderStyle } from "../utils/placeholder";
 
 const Hero = ({ data }) => {
   // Debug log to see what data is being received
@@ -48,6 +49,12 @@ const Hero = ({ data }) => {
                 <img
                   src={profileImage}
                   alt={heroData.name}
+                  width={heroData.profile_image_width || undefined}
+                  height={heroData.profile_image_height || undefined}
+                  style={placeholderStyle(
+                    heroData.profile_image_color,
+                    heroData.profile_image_placeholder
+                  )}
                   className="w-full h-full object-cover rounded-full border-8 border-black dark:border-gray-500"
                   onError={(e) => {
                     console.log("Image failed to load:", profileImage);
@@ -33,7 +33,9 @@ const ImageUpload = ({ currentImage, onImageChange, className = "" }) => {
 
       // Upload file
       const response = await fileAPI.upload(file);
-      const imageUrl = `https://umersaeed.duckdns.org${response.file_url}`;
+      const imageUrl = response.file_url.startsWith("http")
+        ? response.file_url
+        : `https://umersaeed.duckdns.org${response.file_url}`;
 
       onImageChange(imageUrl);
       setPreviewUrl(imageUrl);
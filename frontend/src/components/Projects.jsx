@@ -1,7 +1,20 @@
-import React from "react";
+import React, { useEffect, useRef } from "react";
 import { Github, ExternalLink, Folder, Star, Eye } from "lucide-react";
+import { placeholderStyle } from "../utils/placeholder";
+import { analyticsAPI } from "../services/api";
 
 const Projects = ({ projects }) => {
+  // Count one view per listed project per page load; live updates re-render
+  // this list with fresh objects and must not count again
+  const viewed = useRef(new Set());
+  useEffect(() => {
+    projects.forEach((project) => {
+      if (viewed.current.has(project.id)) return;
+      viewed.current.add(project.id);
+      analyticsAPI.track(project.id, "view");
+    });
+  }, [projects]);
+
   return (
     <section
       id="projects"
@@ -41,6 +54,14 @@ const Projects = ({ projects }) => {
                       <img
                         src={project.image}
                         alt={project.title}
+                        width={project.image_width || undefined}
+                        height={project.image_height || undefined}
+                        loading="lazy"
+                        decoding="async"
+                        style={placeholderStyle(
+                          project.image_color,
+                          project.image_placeholder
+                        )}
                         className="w-full h-48 object-cover rounded-xl transform group-hover:scale-110 transition-transform duration-500"
                       />
                       <div className="absolute inset-0 bg-gradient-to-t from-black/50 to-transparent opacity-0 group-hover:opacity-100 transition-opacity duration-300 rounded-xl"></div>
@@ -89,9 +110,10 @@ const Projects = ({ projects }) => {
 
                 {/* Action Links */}
                 <div className="flex gap-4">
-                  {project.githubUrl && (
+                  {project.github_url && (
                     <a
-                      href={project.githubUrl}
+                      href={project.github_url}
+                      onClick={() => analyticsAPI.track(project.id, "github_click")}
                       target="_blank"
                       rel="noopener noreferrer"
                       className="flex items-center gap-2 text-teal-600 dark:text-teal-400 hover:text-teal-700 dark:hover:text-teal-300 text-lg font-semibold transition-all duration-300 transform hover:scale-110 group/link"
@@ -103,9 +125,10 @@ const Projects = ({ projects }) => {
                       GitHub
                     </a>
                   )}
-                  {project.liveUrl && (
+                  {project.live_url && (
                     <a
-                      href={project.liveUrl}
+                      href={project.live_url}
+                      onClick={() => analyticsAPI.track(project.id, "live_click")}
                       target="_blank"
                       rel="noopener noreferrer"
                       className="flex items-center gap-2 text-teal-600 dark:text-teal-400 hover:text-teal-700 dark:hover:text-teal-300 text-lg font-semibold transition-all duration-300 transform hover:scale-110 group/link"
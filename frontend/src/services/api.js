@@ -28,8 +28,9 @@ export const authAPI = {
 
 // Portfolio data endpoints
 export const portfolioAPI = {
-  getAll: async () => {
-    const response = await api.get('/')
+  // minVersion comes from a change notification; the API won't answer with data older than it
+  getAll: async (minVersion) => {
+    const response = await api.get('/', { params: minVersion ? { min_version: minVersion } : {} })
     return response.data
   },
 }
@@ -73,6 +74,26 @@ export const projectAPI = {
     const response = await api.patch(`/projects/${projectId}/toggle-featured`)
     return response.data
   },
+
+  move: async (projectId, { afterId = null, beforeId = null } = {}) => {
+    const response = await api.patch(`/projects/${projectId}/move`, { after_id: afterId, before_id: beforeId })
+    return response.data
+  },
+
+  archive: async (ids) => {
+    const response = await api.post('/projects/archive', { ids })
+    return response.data
+  },
+
+  restore: async (ids) => {
+    const response = await api.post('/projects/restore', { ids })
+    return response.data
+  },
+
+  getArchived: async (page = 1, pageSize = 20) => {
+    const response = await api.get(`/projects/archived?page=${page}&page_size=${pageSize}`)
+    return response.data
+  },
 }
 
 // Experience endpoints
@@ -96,6 +117,26 @@ export const experienceAPI = {
     const response = await api.delete(`/experiences/${experienceId}`)
     return response.data
   },
+
+  move: async (experienceId, { afterId = null, beforeId = null } = {}) => {
+    const response = await api.patch(`/experiences/${experienceId}/move`, { after_id: afterId, before_id: beforeId })
+    return response.data
+  },
+
+  archive: async (ids) => {
+    const response = await api.post('/experiences/archive', { ids })
+    return response.data
+  },
+
+  restore: async (ids) => {
+    const response = await api.post('/experiences/restore', { ids })
+    return response.data
+  },
+
+  getArchived: async (page = 1, pageSize = 20) => {
+    const response = await api.get(`/experiences/archived?page=${page}&page_size=${pageSize}`)
+    return response.data
+  },
 }
 
 // Settings endpoints
@@ -113,17 +154,82 @@ export const settingsAPI = {
 
 // File upload endpoint
 export const fileAPI = {
+  // Ask the API for a presigned URL, then send the bytes straight to storage
   upload: async (file) => {
-    const formData = new FormData()
-    formData.append('file', file)
-    
-    const response = await api.post('/upload', formData, {
-      headers: {
-        'Content-Type': 'multipart/form-data',
-      },
+    const { data } = await api.post('/upload/presign', {
+      filename: file.name,
+      content_type: file.type,
+      size: file.size,
     })
+    const uploadUrl = data.upload_url.startsWith('http')
+      ? data.upload_url
+      : `${API_BASE_URL}${data.upload_url}`
+    await axios.put(uploadUrl, file, { headers: data.headers })
+    return { file_url: data.file_url, key: data.key }
+  },
+}
+
+// Batch endpoint: apply several operations in one transaction
+export const batchAPI = {
+  apply: async (operations) => {
+    const response = await api.post('/batch', { operations })
     return response.data
   },
 }
 
+// Resized image variants, e.g. imageVariantUrl('abc.png', { w: 600 })
+export const imageVariantUrl = (key, { w, h, fmt = 'webp' } = {}) => {
+  const params = new URLSearchParams({ fmt })
+  if (w) params.set('w', w)
+  if (h) params.set('h', h)
+  return `${API_BASE_URL}/img/${key}?${params}`
+}
+
+// Analytics: events are queued and sent in small batches
+const analyticsQueue = []
+let analyticsTimer = null
+
+const flushAnalytics = () => {
+  analyticsTimer = null
+  if (analyticsQueue.length === 0) return
+  // keepalive lets the request finish even if the page is being unloaded
+  fetch(`${API_BASE_URL}/analytics/events`, {
+    method: 'POST',
+    body: JSON.stringify({ events: analyticsQueue.splice(0, 500) }),
+    headers: { 'Content-Type': 'application/json' },
+    keepalive: true,
+  }).catch(() => {})
+}
+
+export const analyticsAPI = {
+  track: (projectId, kind) => {
+    analyticsQueue.push({ project_id: projectId, kind })
+    if (!analyticsTimer) analyticsTimer = setTimeout(flushAnalytics, 2000)
+  },
+
+  getProjects: async (days = 30) => {
+    const response = await api.get(`/analytics/projects?days=${days}`)
+    return response.data
+  },
+
+  getProject: async (projectId, days = 30) => {
+    const response = await api.get(`/analytics/projects/${projectId}?days=${days}`)
+    return response.data
+  },
+}
+
+if (typeof window !== 'undefined') {
+  window.addEventListener('pagehide', flushAnalytics)
+}
+
+// Live change notifications (Server-Sent Events)
+export const eventsAPI = {
+  subscribe: (onChange, onResync = onChange) => {
+    const source = new EventSource(`${API_BASE_URL}/events`)
+    source.addEventListener('change', (event) => onChange(JSON.parse(event.data)))
+    source.addEventListener('resync', () => onResync(null))
+    return () => source.close()
+  },
+}
+
 export default api
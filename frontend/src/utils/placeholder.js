@@ -0,0 +1,7 @@
+// Paint the precomputed colour / blurred preview until the real image loads
+export const placeholderStyle = (color, placeholder) => ({
+  backgroundColor: color || undefined,
+  backgroundImage: placeholder ? `url(${placeholder})` : undefined,
+  backgroundSize: "cover",
+  backgroundPosition: "center",
+});